@@ -17,9 +17,16 @@ import os
 import sys
 import time
 import logging
+import logging.handlers
+import argparse
+import atexit
+import queue
 from pathlib import Path
 from datetime import datetime
 import traceback
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Add project root to path for imports
 PROJECT_ROOT = Path(__file__).resolve().parent
@@ -27,7 +34,7 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 # Import our custom modules
-from lib.file_text_extractor import FileTextExtractor
+from lib.file_text_extractor import FileTextExtractor, HEAVY_MODULES
 from lib.audio_splitter import split_audio_file, process_long_audio_with_segments
 
 # Import script modules
@@ -44,17 +51,87 @@ def setup_logging():
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     log_file = log_dir / f"llm_extraction_{timestamp}.log"
     
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file, encoding='utf-8'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    # Thread/process names are not in the log format, so skip collecting them per record
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    
+    global _LOG_LISTENER
+    if _LOG_LISTENER is None:
+        # File and console writes happen on a background listener thread, so logging
+        # calls in the hot loops only enqueue the record
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler.setFormatter(formatter)
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+        
+        log_queue = queue.Queue(-1)
+        logging.basicConfig(
+            level=logging.INFO,
+            handlers=[logging.handlers.QueueHandler(log_queue)]
+        )
+        _LOG_LISTENER = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+        _LOG_LISTENER.start()
+        atexit.register(_LOG_LISTENER.stop)
     
     return logging.getLogger(__name__)
 
+# Background thread that writes queued log records to the log file and stdout
+_LOG_LISTENER = None
+
+# Size of each os.write call when saving extracted text (1 MiB)
+WRITE_CHUNK_SIZE = 1024 * 1024
+
+# Characters of each extracted text file shown in a populated ACORD form
+FORM_PREVIEW_CHARS = 300
+
+def _write_text(output_file, text):
+    """Write text to a file as UTF-8 bytes with unbuffered os.write calls"""
+    data = memoryview(text.encode('utf-8'))
+    fd = os.open(str(output_file), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        offset = 0
+        while offset < len(data):
+            offset += os.write(fd, data[offset:offset + WRITE_CHUNK_SIZE])
+    finally:
+        os.close(fd)
+
+# Per-worker extractor, created once by _init_worker when the worker process starts
+_EXTRACTOR = None
+
+def _init_worker(log_queue=None):
+    """Process pool initializer: build one FileTextExtractor per worker"""
+    global _EXTRACTOR
+    if log_queue is not None:
+        # Send worker log records back to the parent process instead of writing them here
+        root_logger = logging.getLogger()
+        root_logger.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+        root_logger.setLevel(logging.INFO)
+    # The pool already spreads files over the CPUs, so PDFs are not split into a nested pool
+    _EXTRACTOR = FileTextExtractor(pdf_workers=1)
+
+def _extract_one(file_path):
+    """Extract text from a single file (module-level so worker processes can pickle it)"""
+    extractor = _EXTRACTOR if _EXTRACTOR is not None else FileTextExtractor(pdf_workers=1)
+    return extractor.process_file(file_path)
+
+def _worker_context():
+    """
+    Multiprocessing context for extraction workers
+    
+    Where available, forkserver is used with the extractor module preloaded, so the
+    heavy imports (OpenCV, pdfplumber, pydub, ...) happen once in the server process
+    and workers share those pages copy-on-write instead of re-importing them.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # The extractor imports its media libraries lazily, so preload them explicitly
+        # (forkserver skips any that aren't installed)
+        context.set_forkserver_preload(["lib.file_text_extractor", *HEAVY_MODULES])
+        return context
+    return multiprocessing.get_context()
+
 class LLMClaimsExtractionProgram:
     """Main orchestrator class for the LLM Claims Extraction Program"""
     
@@ -66,6 +143,17 @@ class LLMClaimsExtractionProgram:
         self.source_output_dir = self.project_root / "source_output_files"
         self.acord_output_dir = self.source_output_dir / "acord"
         self.json_output_dir = self.source_output_dir / "json"
+        self.cache_dir = self.project_root / ".cache" / "acord_templates"
+        
+        # Run timestamp, formatted once and reused by every generated form
+        self._set_run_timestamp()
+        
+        # Number of worker processes used for text extraction
+        self.max_workers = min(os.cpu_count() or 1, 8)
+        
+        # Text extracted by phase 2 in this run, keyed by output file name, so
+        # phase 4 does not have to read it back from disk
+        self.extracted_texts = {}
         
         # Initialize components
         self.text_extractor = FileTextExtractor()
@@ -73,6 +161,11 @@ class LLMClaimsExtractionProgram:
         self.logger.info("🚀 LLM Assisted Claims Submission Text Extraction Program Initialized")
         self.logger.info(f"Project Root: {self.project_root}")
         
+    def _set_run_timestamp(self):
+        """Record the start of the current run"""
+        self.run_started = datetime.now()
+        self.run_stamp = self.run_started.strftime('%Y-%m-%d %H:%M:%S')
+    
     def ensure_directories(self):
         """Ensure all necessary directories exist"""
         directories = [
@@ -80,7 +173,8 @@ class LLMClaimsExtractionProgram:
             self.source_output_dir,
             self.acord_output_dir,
             self.json_output_dir,
-            self.source_output_dir / "json"  # Ensure JSON subdirectory exists
+            self.source_output_dir / "json",  # Ensure JSON subdirectory exists
+            self.cache_dir
         ]
         
         for directory in directories:
@@ -99,11 +193,11 @@ class LLMClaimsExtractionProgram:
             self.logger.info(f"✅ Successfully copied {files_copied} files")
             
             # List copied files
-            copied_files = list(self.source_input_dir.glob("*"))
             self.logger.info("📁 Files in source_input_files:")
-            for file in copied_files:
-                if file.is_file():
-                    self.logger.info(f"   📄 {file.name}")
+            with os.scandir(self.source_input_dir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        self.logger.info(f"   📄 {entry.name}")
             
             return True
             
@@ -122,40 +216,66 @@ class LLMClaimsExtractionProgram:
             self.logger.info("🔄 Starting text extraction process...")
             
             # Process each file in source_input_files
-            source_files = list(self.source_input_dir.glob("*"))
+            # DirEntry.is_file() reuses the type info returned by the directory scan
+            with os.scandir(self.source_input_dir) as entries:
+                source_files = [entry for entry in entries if entry.is_file()]
             processed_count = 0
+            skipped_count = 0
+            self.extracted_texts = {}
             
-            for file_path in source_files:
-                if not file_path.is_file():
-                    continue
-                    
-                self.logger.info(f"\n🔄 Processing: {file_path.name}")
+            self.logger.info(f"⚙️  Extracting {len(source_files)} files with {self.max_workers} worker processes")
+            
+            # Worker records are forwarded to the root logger's handlers in this process
+            mp_context = _worker_context()
+            worker_log_queue = mp_context.Queue(-1)
+            worker_log_listener = logging.handlers.QueueListener(worker_log_queue, *logging.getLogger().handlers)
+            worker_log_listener.start()
+            
+            try:
+                with ProcessPoolExecutor(max_workers=self.max_workers,
+                                         mp_context=mp_context,
+                                         initializer=_init_worker,
+                                         initargs=(worker_log_queue,)) as executor:
+                    futures = {}
+                    for entry in source_files:
+                        if self._is_up_to_date(entry):
+                            self.logger.info("⏭️  Skipping unchanged file: %s", entry.name)
+                            skipped_count += 1
+                            continue
+                        self.logger.info("\n🔄 Processing: %s", entry.name)
+                        futures[executor.submit(_extract_one, entry.path)] = entry
                 
-                try:
-                    # Extract text using our enhanced extractor
-                    file_name, file_type, extracted_text = self.text_extractor.process_file(str(file_path))
+                    for future in as_completed(futures):
+                        entry = futures[future]
                     
-                    if extracted_text and not extracted_text.startswith("Error"):
-                        # Save extracted text to output directory
-                        output_file = self.source_output_dir / f"{file_path.stem}.txt"
-                        
-                        with open(output_file, 'w', encoding='utf-8') as f:
-                            f.write(extracted_text)
-                        
-                        self.logger.info(f"✅ Extracted text saved to: {output_file.name}")
-                        processed_count += 1
-                        
-                        # Show preview
-                        preview = extracted_text[:200] + "..." if len(extracted_text) > 200 else extracted_text
-                        self.logger.info(f"📝 Preview: {preview}")
-                    else:
-                        self.logger.warning(f"⚠️  Failed to extract text from {file_path.name}: {extracted_text}")
+                        try:
+                            # Extract text using our enhanced extractor
+                            file_name, file_type, extracted_text = future.result()
                         
-                except Exception as e:
-                    self.logger.error(f"❌ Error processing {file_path.name}: {str(e)}")
-                    continue
+                            if extracted_text and not extracted_text.startswith("Error"):
+                                # Save extracted text to output directory
+                                output_file = self.source_output_dir / f"{os.path.splitext(entry.name)[0]}.txt"
+                            
+                                _write_text(output_file, extracted_text)
+                                self.extracted_texts[output_file.name] = extracted_text
+                            
+                                self.logger.info("✅ Extracted text saved to: %s", output_file.name)
+                                processed_count += 1
+                            
+                                # Show preview (only build it when INFO records are emitted)
+                                if self.logger.isEnabledFor(logging.INFO):
+                                    preview = extracted_text[:200] + "..." if len(extracted_text) > 200 else extracted_text
+                                    self.logger.info("📝 Preview: %s", preview)
+                            else:
+                                self.logger.warning("⚠️  Failed to extract text from %s: %s", entry.name, extracted_text)
+                            
+                        except Exception as e:
+                            self.logger.error("❌ Error processing %s: %s", entry.name, e)
+                            continue
+            finally:
+                worker_log_listener.stop()
             
-            self.logger.info(f"\n✅ Phase 2 Complete: Processed {processed_count} files")
+            self.logger.info(f"\n✅ Phase 2 Complete: Processed {processed_count} files, skipped {skipped_count} unchanged")
             return True
             
         except Exception as e:
@@ -163,6 +283,14 @@ class LLMClaimsExtractionProgram:
             self.logger.error(traceback.format_exc())
             return False
     
+    def _is_up_to_date(self, entry):
+        """Check whether a source file's extracted text exists and is at least as new as the source"""
+        output_file = self.source_output_dir / f"{os.path.splitext(entry.name)[0]}.txt"
+        try:
+            return output_file.stat().st_mtime >= entry.stat().st_mtime
+        except FileNotFoundError:
+            return False
+    
     def phase_3_populate_acord_forms(self):
         """Phase 3: Populate ACORD forms with extracted text data"""
         self.logger.info("=" * 80)
@@ -185,17 +313,20 @@ class LLMClaimsExtractionProgram:
             self.logger.info(f"📋 Found {len(acord_templates)} ACORD form templates")
             self.logger.info(f"📝 Found {len(extracted_texts)} extracted text files")
             
+            # Read every extracted text file once, rather than once per template
+            file_contents = self._read_all_files(extracted_texts, max_chars=FORM_PREVIEW_CHARS)
+            
             # Process each ACORD form template
             for template in acord_templates:
                 self.logger.info(f"\n🔄 Processing ACORD template: {template.name}")
                 
                 try:
-                    # Extract text from ACORD template
-                    template_text = self.text_extractor.extract_text_from_pdf(str(template))
+                    # Extract text from ACORD template (cached by content hash)
+                    template_text = self._extract_template_text(template)
                     
                     if template_text and not template_text.startswith("Error"):
                         # Create populated form content
-                        populated_content = self.create_populated_acord_form(template_text, extracted_texts)
+                        populated_content = self.create_populated_acord_form(template_text, extracted_texts, file_contents)
                         
                         # Save populated form
                         output_file = self.acord_output_dir / f"populated_{template.stem}.txt"
@@ -218,34 +349,82 @@ class LLMClaimsExtractionProgram:
             self.logger.error(traceback.format_exc())
             return False
     
-    def create_populated_acord_form(self, template_text, extracted_texts):
+    def _extract_template_text(self, template):
+        """Extract ACORD template text, reusing a cached copy keyed by the PDF's SHA-256"""
+        digest = hashlib.sha256(template.read_bytes()).hexdigest()
+        cache_path = self.cache_dir / f"{digest}.txt"
+        
+        if cache_path.exists():
+            self.logger.info(f"♻️  Using cached template text for {template.name}")
+            return cache_path.read_text(encoding='utf-8')
+        
+        template_text = self.text_extractor.extract_text_from_pdf(str(template))
+        
+        # Only cache successful extractions so failures are retried next run
+        if template_text and not template_text.startswith("Error"):
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            cache_path.write_text(template_text, encoding='utf-8')
+        
+        return template_text
+    
+    def _read_all_files(self, paths, max_chars=None):
+        """
+        Read text files up front, mapping each path to its content or the read error
+        
+        With max_chars set, only the head of each file is read and decoded: at most
+        max_chars + 1 characters are returned, so callers can still tell whether the
+        file was longer than max_chars.
+        """
+        contents = {}
+        for path in paths:
+            try:
+                if max_chars is None:
+                    contents[path] = Path(path).read_bytes().decode('utf-8', errors='replace')
+                else:
+                    # A UTF-8 character is at most 4 bytes, so this many bytes always
+                    # covers max_chars + 1 complete characters when the file is that long
+                    with open(path, 'rb') as f:
+                        head = f.read((max_chars + 1) * 4)
+                    contents[path] = head.decode('utf-8', errors='replace')[:max_chars + 1]
+            except Exception as e:
+                contents[path] = e
+        return contents
+    
+    def create_populated_acord_form(self, template_text, extracted_texts, file_contents=None):
         """Create a populated ACORD form by merging template with extracted data"""
-        populated_content = f"POPULATED ACORD FORM\n"
-        populated_content += f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        populated_content += "=" * 80 + "\n\n"
+        if file_contents is None:
+            file_contents = self._read_all_files(extracted_texts, max_chars=FORM_PREVIEW_CHARS)
+        
+        parts = [
+            "POPULATED ACORD FORM\n",
+            f"Generated: {self.run_stamp}\n",
+            "=" * 80 + "\n\n",
+        ]
         
         # Add template content
-        populated_content += "ORIGINAL TEMPLATE CONTENT:\n"
-        populated_content += "-" * 40 + "\n"
-        populated_content += template_text + "\n\n"
+        parts.append("ORIGINAL TEMPLATE CONTENT:\n")
+        parts.append("-" * 40 + "\n")
+        parts.append(template_text + "\n\n")
         
         # Add extracted data
-        populated_content += "EXTRACTED DATA FOR POPULATION:\n"
-        populated_content += "-" * 40 + "\n"
+        parts.append("EXTRACTED DATA FOR POPULATION:\n")
+        parts.append("-" * 40 + "\n")
         
         for text_file in extracted_texts:
             try:
-                with open(text_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
+                content = file_contents[text_file]
+                if isinstance(content, Exception):
+                    raise content
                 
-                populated_content += f"\n📄 Source: {text_file.stem}\n"
-                populated_content += f"📝 Content: {content[:300]}...\n" if len(content) > 300 else f"📝 Content: {content}\n"
-                populated_content += "-" * 30 + "\n"
+                parts.append(f"\n📄 Source: {text_file.stem}\n")
+                parts.append(f"📝 Content: {content[:FORM_PREVIEW_CHARS]}...\n" if len(content) > FORM_PREVIEW_CHARS else f"📝 Content: {content}\n")
+                parts.append("-" * 30 + "\n")
                 
             except Exception as e:
-                populated_content += f"\n❌ Error reading {text_file.name}: {str(e)}\n"
+                parts.append(f"\n❌ Error reading {text_file.name}: {str(e)}\n")
         
-        return populated_content
+        # Join once at the end; repeated += on a growing string is quadratic
+        return "".join(parts)
     
     def phase_4_import_data_to_json(self):
         """Phase 4: Import extracted data to JSON schemas"""
@@ -256,8 +435,8 @@ class LLMClaimsExtractionProgram:
         try:
             self.logger.info("🔄 Starting JSON data import process...")
             
-            # Run the import data script
-            import_data_main()
+            # Run the import data script, handing over text already extracted in this run
+            import_data_main(extracted_map=self.extracted_texts)
             
             self.logger.info("✅ Phase 4 Complete: Data imported to JSON schemas")
             return True
@@ -270,7 +449,8 @@ class LLMClaimsExtractionProgram:
     def run_complete_workflow(self):
         """Run the complete workflow through all phases"""
         self.logger.info("🚀 STARTING COMPLETE LLM CLAIMS EXTRACTION WORKFLOW")
-        self.logger.info(f"⏰ Start Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        self._set_run_timestamp()
+        self.logger.info(f"⏰ Start Time: {self.run_stamp}")
         
         # Ensure directories exist
         self.ensure_directories()
@@ -332,17 +512,8 @@ class LLMClaimsExtractionProgram:
         self.logger.info(f"🔄 Running Phase {phase_number} only...")
         return phase_functions[phase_number]()
 
-def main():
-    """Main function with user interaction"""
-    print("🚀 LLM Assisted Claims Submission Text Extraction Program")
-    print("=" * 80)
-    print("This program automates the extraction and processing of claims data")
-    print("from various file formats and populates ACORD forms and JSON schemas.")
-    print()
-    
-    # Initialize the program
-    program = LLMClaimsExtractionProgram()
-    
+def run_interactive_menu(program):
+    """Prompt for a single workflow option and run it"""
     while True:
         print("\n📋 Available Options:")
         print("1. Run Complete Workflow (All Phases)")
@@ -356,25 +527,46 @@ def main():
         
         if choice == "1":
             print("\n🔄 Starting complete workflow...")
-            program.run_complete_workflow()
-            break
-        elif choice == "2":
-            program.run_individual_phase(1)
-            break
-        elif choice == "3":
-            program.run_individual_phase(2)
-            break
-        elif choice == "4":
-            program.run_individual_phase(3)
-            break
-        elif choice == "5":
-            program.run_individual_phase(4)
-            break
+            return program.run_complete_workflow()
+        elif choice in ("2", "3", "4", "5"):
+            return program.run_individual_phase(int(choice) - 1)
         elif choice == "6":
             print("👋 Goodbye!")
-            break
+            return True
         else:
             print("❌ Invalid choice. Please select 1-6.")
 
+def main():
+    """Main function for command-line and interactive usage"""
+    parser = argparse.ArgumentParser(description="LLM Assisted Claims Submission Text Extraction Program")
+    parser.add_argument("--interactive", action="store_true",
+                       help="Show the interactive menu (default when no command is given)")
+    subparsers = parser.add_subparsers(dest="cmd", help="Workflow step to run")
+    subparsers.add_parser("all", help="Run the complete workflow (all phases)")
+    subparsers.add_parser("phase1", help="Phase 1: Copy source files")
+    subparsers.add_parser("phase2", help="Phase 2: Extract text")
+    subparsers.add_parser("phase3", help="Phase 3: Populate ACORD forms")
+    subparsers.add_parser("phase4", help="Phase 4: Import data to JSON")
+    
+    args = parser.parse_args()
+    
+    print("🚀 LLM Assisted Claims Submission Text Extraction Program")
+    print("=" * 80)
+    print("This program automates the extraction and processing of claims data")
+    print("from various file formats and populates ACORD forms and JSON schemas.")
+    print()
+    
+    # Initialize the program
+    program = LLMClaimsExtractionProgram()
+    
+    if args.interactive or args.cmd is None:
+        success = run_interactive_menu(program)
+    elif args.cmd == "all":
+        success = program.run_complete_workflow()
+    else:
+        success = program.run_individual_phase(int(args.cmd[len("phase"):]))
+    
+    sys.exit(0 if success else 1)
+
 if __name__ == "__main__":
     main()
@@ -11,9 +11,19 @@ import os
 import sys
 import logging
 import argparse
+import itertools
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Add project root to path for imports
 PROJECT_ROOT = Path(__file__).resolve().parent
@@ -22,7 +32,7 @@ if str(PROJECT_ROOT) not in sys.path:
 
 # Import our custom modules
 from lib.text_chunker import ClaimsTextChunker, TextChunk
-from lib.embeddings_generator import ClaimsEmbeddingsGenerator, EmbeddingResult
+from lib.embeddings_generator import ClaimsEmbeddingsGenerator, EmbeddingBatch
 from lib.vector_database import VectorDatabaseManager
 from lib.search_api import ClaimsSearchAPI
 
@@ -35,17 +45,21 @@ class ClaimsEmbeddingsPipeline:
                  vector_db_type: str = "pinecone",
                  index_name: str = "claims-embeddings",
                  chunk_size: int = 512,
-                 chunk_overlap: int = 50):
+                 chunk_overlap: int = 50,
+                 batch_size: Optional[int] = None,
+                 quantize: str = "none"):
         """
         Initialize the embeddings pipeline
         
         Args:
             source_dir: Directory containing source text files
             output_dir: Directory to save processed data
-            vector_db_type: Type of vector database ('pinecone' or 'weaviate')
+            vector_db_type: Type of vector database ('pinecone', 'weaviate', 'local' or 'faiss')
             index_name: Name of the vector database index
             chunk_size: Size of text chunks for embedding
             chunk_overlap: Overlap between chunks
+            batch_size: Number of chunks encoded per model forward pass (None picks one for the device)
+            quantize: Vector storage format ('none', 'bf16', 'fp16', 'int8' or 'binary'; local database only)
         """
         self.logger = logging.getLogger(__name__)
         
@@ -65,6 +79,9 @@ class ClaimsEmbeddingsPipeline:
         )
         
         self.index_name = index_name
+        self.run_started = datetime.now()
+        self.batch_size = batch_size or self.embeddings_generator.batch_size
+        self.quantize = quantize
         self.logger.info(f"Embeddings pipeline initialized with source: {self.source_dir}")
     
     def run_full_pipeline(self) -> Dict[str, Any]:
@@ -78,8 +95,11 @@ class ClaimsEmbeddingsPipeline:
         self.logger.info("🚀 STARTING CLAIMS EMBEDDINGS PIPELINE")
         self.logger.info("=" * 80)
         
+        # Captured once per run and reused for the metadata timestamp
+        self.run_started = datetime.now()
+        
         results = {
-            'start_time': datetime.now().isoformat(),
+            'start_time': self.run_started.isoformat(),
             'source_dir': str(self.source_dir),
             'output_dir': str(self.output_dir),
             'index_name': self.index_name,
@@ -89,35 +109,20 @@ class ClaimsEmbeddingsPipeline:
         }
         
         try:
-            # Step 1: Chunk text files
-            self.logger.info("📄 Step 1: Chunking text files...")
-            chunks = self._chunk_files()
-            results['steps_completed'].append('chunking')
-            results['statistics']['chunks_created'] = len(chunks)
-            self.logger.info(f"✅ Created {len(chunks)} chunks")
-            
-            # Step 2: Generate embeddings
-            self.logger.info("🧠 Step 2: Generating embeddings...")
-            embeddings = self._generate_embeddings(chunks)
-            results['steps_completed'].append('embeddings_generation')
+            # Steps 1-4: Chunk text files, generate embeddings, set up the index and store embeddings.
+            # Chunk batches stream straight into the encoder, and upserts run on a background
+            # thread so they overlap with encoding of the next batch.
+            self.logger.info("🧠 Steps 1-4: Chunking, generating and storing embeddings...")
+            chunk_summaries = []
+            embeddings = self._generate_and_store_embeddings(self._stream_batches(chunk_summaries))
+            results['steps_completed'].extend(['chunking', 'embeddings_generation', 'vector_database_setup', 'embeddings_storage'])
+            results['statistics']['chunks_created'] = len(chunk_summaries)
             results['statistics']['embeddings_generated'] = len(embeddings)
-            self.logger.info(f"✅ Generated {len(embeddings)} embeddings")
-            
-            # Step 3: Create vector database index
-            self.logger.info("🗄️ Step 3: Setting up vector database...")
-            self._setup_vector_database(embeddings)
-            results['steps_completed'].append('vector_database_setup')
-            self.logger.info("✅ Vector database setup complete")
-            
-            # Step 4: Store embeddings
-            self.logger.info("💾 Step 4: Storing embeddings...")
-            self._store_embeddings(embeddings)
-            results['steps_completed'].append('embeddings_storage')
-            self.logger.info("✅ Embeddings stored successfully")
+            self.logger.info(f"✅ Created {len(chunk_summaries)} chunks; generated and stored {len(embeddings)} embeddings")
             
             # Step 5: Save metadata
             self.logger.info("📋 Step 5: Saving metadata...")
-            self._save_metadata(chunks, embeddings, results)
+            self._save_metadata(chunk_summaries, embeddings, results)
             results['steps_completed'].append('metadata_save')
             self.logger.info("✅ Metadata saved")
             
@@ -137,8 +142,20 @@ class ClaimsEmbeddingsPipeline:
         
         return results
     
-    def _chunk_files(self) -> List[TextChunk]:
-        """Chunk all text files in the source directory"""
+    def _stream_batches(self, chunk_summaries: List[Dict[str, Any]] = None) -> Iterator[List[TextChunk]]:
+        """
+        Chunk all text files in the source directory, yielding batch_size chunks at a time
+        
+        Only a bounded window of files is chunked ahead of the consumer, so the full
+        chunk list is never held in memory and encoding starts after the first file.
+        
+        Args:
+            chunk_summaries: Optional list that receives a small summary dict per chunk
+                for the pipeline metadata
+            
+        Yields:
+            Lists of TextChunk objects (the last one may be shorter than batch_size)
+        """
         if not self.source_dir.exists():
             raise FileNotFoundError(f"Source directory not found: {self.source_dir}")
         
@@ -150,92 +167,183 @@ class ClaimsEmbeddingsPipeline:
         
         self.logger.info(f"Found {len(text_files)} text files to process")
         
-        all_chunks = []
-        for file_path in text_files:
-            self.logger.info(f"Processing: {file_path.name}")
-            chunks = self.chunker.chunk_file(str(file_path))
-            all_chunks.extend(chunks)
+        # Chunking only touches per-file state, so files can be read concurrently
+        max_workers = 16
+        batch = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            files = iter(text_files)
+            for text_file in itertools.islice(files, 2 * max_workers):
+                pending.append(executor.submit(self.chunker.chunk_file, str(text_file)))
+            
+            while pending:
+                file_chunks = pending.popleft().result()
+                for text_file in itertools.islice(files, 1):
+                    pending.append(executor.submit(self.chunker.chunk_file, str(text_file)))
+                
+                for chunk in file_chunks:
+                    if chunk_summaries is not None:
+                        chunk_summaries.append({
+                            'chunk_id': chunk.chunk_id,
+                            'source_file': chunk.source_file,
+                            'chunk_size': len(chunk.content),
+                            'start_char': chunk.start_char,
+                            'end_char': chunk.end_char
+                        })
+                    batch.append(chunk)
+                    if len(batch) == self.batch_size:
+                        yield batch
+                        batch = []
         
-        return all_chunks
+        if batch:
+            yield batch
     
-    def _generate_embeddings(self, chunks: List[TextChunk]) -> List[EmbeddingResult]:
-        """Generate embeddings for all chunks"""
+    def _generate_embeddings(self, chunks: List[TextChunk]) -> EmbeddingBatch:
+        """Generate embeddings for a batch of chunks"""
         if not chunks:
             raise ValueError("No chunks to process")
         
-        # Generate embeddings in batches
-        embeddings = self.embeddings_generator.generate_embeddings_from_chunks(chunks)
+        return self.embeddings_generator.generate_embeddings_from_chunks(
+            chunks, batch_size=self.batch_size
+        )
+    
+    def _generate_and_store_embeddings(self, chunk_batches: Iterable[List[TextChunk]]) -> EmbeddingBatch:
+        """
+        Generate embeddings batch by batch while a consumer thread upserts finished batches
+        
+        The bounded queue double-buffers batches: the model encodes batch N+1 while
+        batch N is being written to the vector database.
+        
+        Args:
+            chunk_batches: Iterable of TextChunk lists, e.g. from _stream_batches
+            
+        Returns:
+            EmbeddingBatch with all generated embeddings
+        """
+        upsert_queue = queue.Queue(maxsize=4)
+        upsert_errors = []
+        
+        def consume():
+            while True:
+                batch = upsert_queue.get()
+                if batch is None:
+                    break
+                try:
+                    self._store_embeddings(batch)
+                except Exception as e:
+                    upsert_errors.append(str(e))
+        
+        batches = []
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            consumer = None
+            try:
+                for chunk_batch in chunk_batches:
+                    batch = self._generate_embeddings(chunk_batch)
+                    
+                    # The index needs the embedding dimension, so create it from the first batch
+                    if consumer is None:
+                        self._setup_vector_database(batch)
+                        consumer = executor.submit(consume)
+                    
+                    upsert_queue.put(batch)
+                    batches.append(batch)
+            finally:
+                if consumer is not None:
+                    upsert_queue.put(None)
+        
+        if not batches:
+            raise ValueError("No chunks to process")
+        
+        if upsert_errors:
+            raise RuntimeError(f"Failed to store {len(upsert_errors)} embedding batches: {upsert_errors[0]}")
         
-        # Save embeddings to file for backup
-        embeddings_file = self.output_dir / "embeddings.json"
-        self.embeddings_generator.save_embeddings(embeddings, str(embeddings_file))
+        # Batches were upserted without saving; write the index to disk once
+        if not self.vector_db.flush(self.index_name):
+            raise RuntimeError("Failed to save the vector database index")
+        
+        embeddings = EmbeddingBatch.concatenate(batches)
+        
+        # Save embeddings to file for backup (float16 embeddings.npy + embeddings.meta.json)
+        embeddings_file = self.output_dir / "embeddings.npy"
+        self.embeddings_generator.save_embeddings(embeddings, str(embeddings_file), format="npy")
         
         return embeddings
     
-    def _setup_vector_database(self, embeddings: List[EmbeddingResult]):
+    def _setup_vector_database(self, embeddings: EmbeddingBatch):
         """Set up vector database index"""
         if not embeddings:
             raise ValueError("No embeddings to store")
         
         # Get embedding dimension
-        embedding_dim = embeddings[0].embedding_dim
+        embedding_dim = embeddings.embedding_dim
         
         # Create index
         success = self.vector_db.create_index(
             index_name=self.index_name,
             dimension=embedding_dim,
-            metric='cosine'
+            metric='cosine',
+            quantize=self.quantize
         )
         
         if not success:
             raise RuntimeError(f"Failed to create vector database index: {self.index_name}")
     
-    def _store_embeddings(self, embeddings: List[EmbeddingResult]):
+    def _store_embeddings(self, embeddings: EmbeddingBatch):
         """Store embeddings in vector database"""
         if not embeddings:
             raise ValueError("No embeddings to store")
         
-        success = self.vector_db.upsert_embeddings(embeddings, self.index_name)
+        # Saved once by _generate_and_store_embeddings after the last batch
+        success = self.vector_db.upsert_embeddings(embeddings, self.index_name, persist=False)
         
         if not success:
             raise RuntimeError("Failed to store embeddings in vector database")
     
-    def _save_metadata(self, chunks: List[TextChunk], embeddings: List[EmbeddingResult], results: Dict):
-        """Save pipeline metadata and statistics"""
+    def _save_metadata(self, chunk_summaries: List[Dict[str, Any]], embeddings: EmbeddingBatch, results: Dict):
+        """
+        Save pipeline metadata and statistics
+        
+        Args:
+            chunk_summaries: Per-chunk summaries collected while chunking
+            embeddings: EmbeddingBatch with every embedding generated in this run
+            results: Pipeline results so far
+        """
         metadata = {
             'pipeline_info': {
                 'version': '1.0',
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': self.run_started.isoformat(),
                 'source_directory': str(self.source_dir),
                 'output_directory': str(self.output_dir),
                 'index_name': self.index_name
             },
             'statistics': {
-                'total_chunks': len(chunks),
+                'total_chunks': len(chunk_summaries),
                 'total_embeddings': len(embeddings),
-                'embedding_dimension': embeddings[0].embedding_dim if embeddings else 0,
+                'embedding_dimension': embeddings.embedding_dim if len(embeddings) else 0,
                 'model_name': self.embeddings_generator.model_name,
                 'chunk_size': self.chunker.chunk_size,
-                'chunk_overlap': self.chunker.chunk_overlap
+                'chunk_overlap': self.chunker.chunk_overlap,
+                'batch_size': self.batch_size,
+                'quantize': self.quantize
             },
-            'chunks_summary': [
-                {
-                    'chunk_id': chunk.chunk_id,
-                    'source_file': chunk.source_file,
-                    'chunk_size': len(chunk.content),
-                    'start_char': chunk.start_char,
-                    'end_char': chunk.end_char
-                }
-                for chunk in chunks
-            ],
+            'chunks_summary': chunk_summaries,
             'pipeline_results': results
         }
         
         # Save metadata
         metadata_file = self.output_dir / "pipeline_metadata.json"
-        import json
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        if ORJSON_AVAILABLE:
+            # orjson serializes straight to UTF-8 bytes and is much faster on large chunk summaries
+            metadata_file.write_bytes(
+                orjson.dumps(
+                    metadata,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                )
+            )
+        else:
+            import json
+            with open(metadata_file, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, indent=2, ensure_ascii=False)
         
         self.logger.info(f"Metadata saved to: {metadata_file}")
     
@@ -278,12 +386,16 @@ def main():
     parser = argparse.ArgumentParser(description="Claims Embeddings Pipeline")
     parser.add_argument("--source-dir", type=str, help="Source directory containing text files")
     parser.add_argument("--output-dir", type=str, help="Output directory for processed data")
-    parser.add_argument("--vector-db", type=str, choices=["pinecone", "weaviate"], 
+    parser.add_argument("--vector-db", type=str, choices=["pinecone", "weaviate", "local", "faiss"], 
                        default="pinecone", help="Vector database type")
     parser.add_argument("--index-name", type=str, default="claims-embeddings", 
                        help="Vector database index name")
     parser.add_argument("--chunk-size", type=int, default=512, help="Text chunk size")
     parser.add_argument("--chunk-overlap", type=int, default=50, help="Chunk overlap")
+    parser.add_argument("--batch-size", type=int, default=None,
+                       help="Embedding batch size (default: chosen from GPU memory or CPU cores)")
+    parser.add_argument("--quantize", type=str, choices=["none", "bf16", "fp16", "int8", "binary"],
+                       default="none", help="Vector storage format (local database only)")
     parser.add_argument("--test-search", action="store_true", help="Test search after pipeline")
     parser.add_argument("--query", type=str, default="property loss claim", 
                        help="Test search query")
@@ -310,7 +422,9 @@ def main():
         vector_db_type=args.vector_db,
         index_name=args.index_name,
         chunk_size=args.chunk_size,
-        chunk_overlap=args.chunk_overlap
+        chunk_overlap=args.chunk_overlap,
+        batch_size=args.batch_size,
+        quantize=args.quantize
     )
     
     # Run pipeline
@@ -145,8 +145,8 @@ def example_4_search_simulation():
         "Estimated damage of $150,000 to manufacturing equipment and building"
     ]
     
-    # Generate embeddings for documents
-    doc_embeddings = generator.generate_embeddings_batch(documents)
+    # Generate embeddings for documents (one matrix, so scoring is a single matrix product)
+    doc_embeddings = generator.encode_batch(documents)
     
     # Generate embedding for search query
     query_text = "equipment damage claim"
@@ -156,9 +156,10 @@ def example_4_search_simulation():
     print(f"Query embedding dimension: {query_embedding.embedding_dim}")
     print(f"Query vector shape: {query_embedding.embedding.shape}")
     
-    # Simulate similarity search (without actual vector database)
-    print(f"\nFound {len(documents)} documents to search through")
-    print("In a real implementation, this would use vector similarity search")
+    # Similarity search in memory (without actual vector database)
+    print(f"\nTop matches among {len(documents)} documents:")
+    for index, score in doc_embeddings.top_k(query_embedding.embedding, k=3):
+        print(f"  {score:.3f}  {documents[index]}")
 
 def example_5_web_interface():
     """Example 5: Web interface usage"""
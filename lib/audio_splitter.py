@@ -4,13 +4,36 @@ Audio file splitter utility for long audio files
 """
 
 import os
-from pydub import AudioSegment
+import shutil
+import subprocess
 import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+try:
+    import soxr
+    SOXR_AVAILABLE = True
+except ImportError:
+    SOXR_AVAILABLE = False
+
+# Sample rate of the exported segments (optimal for speech recognition)
+TARGET_SAMPLE_RATE = 16000
 
 def split_audio_file(input_file, output_dir, segment_length=300000):
     """
     Split audio file into smaller segments
     
+    A single ffmpeg process decodes the input once and resamples, mixes down and
+    cuts it with the segment muxer, instead of one export (and ffmpeg spawn) per segment.
+    Without ffmpeg on PATH, formats libsndfile can read are streamed with soundfile.
+    
     Args:
         input_file: Path to input audio file
         output_dir: Directory to save segments
@@ -25,45 +48,121 @@ def split_audio_file(input_file, output_dir, segment_length=300000):
     os.makedirs(output_dir, exist_ok=True)
     
     try:
-        # Load audio file
-        audio = AudioSegment.from_file(input_file)
-        duration = len(audio)
+        base_name = os.path.splitext(os.path.basename(input_file))[0]
         
-        print(f"Total duration: {duration/1000:.1f} seconds")
-        print(f"Number of segments: {duration // segment_length + 1}")
+        if shutil.which('ffmpeg') is None and SOUNDFILE_AVAILABLE:
+            segments = _split_with_soundfile(input_file, output_dir, segment_length, base_name)
+        else:
+            segments = _split_with_ffmpeg(input_file, output_dir, segment_length, base_name)
         
-        segments = []
-        for i in range(0, duration, segment_length):
-            # Extract segment
-            segment = audio[i:i + segment_length]
-            
-            # Create filename
-            base_name = os.path.splitext(os.path.basename(input_file))[0]
-            segment_name = f"{base_name}_segment_{i//segment_length + 1:03d}.wav"
-            segment_path = os.path.join(output_dir, segment_name)
-            
-            # Export segment
-            segment.export(
-                segment_path,
-                format='wav',
-                parameters=[
-                    '-ar', '16000',      # 16kHz sample rate
-                    '-ac', '1',          # Mono channel
-                    '-f', 'wav',         # WAV format
-                    '-acodec', 'pcm_s16le'  # PCM 16-bit
-                ]
-            )
-            
-            segments.append(segment_path)
-            print(f"Created: {segment_name} ({len(segment)/1000:.1f}s)")
+        for segment_path in segments:
+            print(f"Created: {os.path.basename(segment_path)}")
         
         print(f"\n✅ Successfully created {len(segments)} segments")
         return segments
         
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Error splitting audio: {e.stderr.strip() or e}")
+        return []
     except Exception as e:
         print(f"❌ Error splitting audio: {e}")
         return []
 
+def _split_with_ffmpeg(input_file, output_dir, segment_length, base_name):
+    """Cut the file into 16 kHz mono PCM segments with one ffmpeg segment-muxer run"""
+    segment_pattern = os.path.join(output_dir, f"{base_name}_segment_%03d.wav")
+    
+    # ffmpeg writes the names of the segments it creates to this list file
+    with tempfile.TemporaryDirectory() as temp_dir:
+        segment_list = os.path.join(temp_dir, "segments.txt")
+        
+        subprocess.run(
+            [
+                'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+                '-i', input_file,
+                '-ar', str(TARGET_SAMPLE_RATE),  # 16kHz sample rate
+                '-ac', '1',               # Mono channel
+                '-c:a', 'pcm_s16le',      # PCM 16-bit
+                '-f', 'segment',
+                '-segment_time', f"{segment_length/1000:.3f}",
+                '-segment_start_number', '1',
+                '-segment_list', segment_list,
+                '-segment_list_type', 'flat',
+                segment_pattern
+            ],
+            check=True, capture_output=True, text=True
+        )
+        
+        with open(segment_list, 'r', encoding='utf-8') as f:
+            segment_names = [line.strip() for line in f if line.strip()]
+    
+    return [os.path.join(output_dir, os.path.basename(name)) for name in segment_names]
+
+def _split_with_soundfile(input_file, output_dir, segment_length, base_name):
+    """
+    Write each streamed segment as a 16 kHz mono PCM 16-bit WAV file
+    
+    Segments are encoded and written by a process pool while the next ones are read;
+    at most two segments per worker are in flight so memory stays bounded.
+    """
+    max_workers = os.cpu_count() or 1
+    segments = []
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for i, samples in enumerate(iter_audio_segments(input_file, segment_length), 1):
+            segment_path = os.path.join(output_dir, f"{base_name}_segment_{i:03d}.wav")
+            # int16 halves what is pickled to the worker and is exactly what PCM_16 stores
+            pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+            pending.append(executor.submit(_write_wav, (segment_path, pcm)))
+            
+            if len(pending) >= 2 * max_workers:
+                segments.append(pending.popleft().result())
+        
+        while pending:
+            segments.append(pending.popleft().result())
+    
+    return segments
+
+def _write_wav(segment):
+    """Write one (path, int16 samples) segment; module-level so worker processes can pickle it"""
+    segment_path, samples = segment
+    sf.write(segment_path, samples, TARGET_SAMPLE_RATE, subtype='PCM_16')
+    return segment_path
+
+def iter_audio_segments(input_file, segment_length=300000):
+    """
+    Stream an audio file as 16 kHz mono segments without decoding it all at once
+    
+    Only one segment's frames are held at a time, as a numpy array, rather than the
+    whole file as pydub's Python sample array.
+    
+    Args:
+        input_file: Path to an audio file readable by libsndfile (WAV, FLAC, OGG, ...)
+        segment_length: Length of each segment in milliseconds (default: 5 minutes)
+        
+    Yields:
+        float32 numpy arrays of mono samples at TARGET_SAMPLE_RATE
+    """
+    if not SOUNDFILE_AVAILABLE:
+        raise ImportError("soundfile package is required. Install with: pip install soundfile")
+    
+    with sf.SoundFile(input_file) as f:
+        frames_per_segment = int(segment_length / 1000 * f.samplerate)
+        for block in f.blocks(blocksize=frames_per_segment, dtype='float32', always_2d=True):
+            samples = block.mean(axis=1, dtype=np.float32)  # Mix down to mono
+            if f.samplerate != TARGET_SAMPLE_RATE:
+                samples = _resample(samples, f.samplerate)
+            yield samples
+
+def _resample(samples, sample_rate):
+    """Resample mono samples to TARGET_SAMPLE_RATE (soxr when installed, else linear interpolation)"""
+    if SOXR_AVAILABLE:
+        return soxr.resample(samples, sample_rate, TARGET_SAMPLE_RATE)
+    
+    target_length = int(round(len(samples) * TARGET_SAMPLE_RATE / sample_rate))
+    positions = np.arange(target_length) * (sample_rate / TARGET_SAMPLE_RATE)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
 def process_long_audio_with_segments(input_file, output_dir="./audio_segments"):
     """
     Split long audio file and process each segment
@@ -7,16 +7,122 @@ Author: LLM Claims Processing Team
 Version: 1.0
 """
 
+import os
 import logging
+import operator
 import numpy as np
 from typing import List, Dict, Optional, Union
 from pathlib import Path
 import json
 import pickle
-from dataclasses import dataclass, asdict
+import hashlib
+import sqlite3
+import threading
+from functools import lru_cache
+from dataclasses import dataclass
 from sentence_transformers import SentenceTransformer
 import torch
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from transformers import AutoTokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _l2_normalize_rows_numba(vectors):
+        """Normalize each row in place; rows run in parallel and the inner loop vectorizes"""
+        for i in prange(vectors.shape[0]):
+            total = 0.0
+            for j in range(vectors.shape[1]):
+                total += vectors[i, j] * vectors[i, j]
+            norm = max(np.sqrt(total), 1e-12)
+            for j in range(vectors.shape[1]):
+                vectors[i, j] /= norm
+
+def l2_normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize the rows of a float32 matrix in place
+    
+    Uses a parallel Numba kernel when numba is installed, otherwise NumPy in-place division.
+    
+    Args:
+        vectors: (N, D) C-contiguous float32 array (modified in place)
+        
+    Returns:
+        The same array
+    """
+    if NUMBA_AVAILABLE and vectors.dtype == np.float32 and vectors.flags.c_contiguous:
+        _l2_normalize_rows_numba(vectors)
+    else:
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return vectors
+
+def topk_cosine(queries: np.ndarray, vectors: np.ndarray, k: int = 10):
+    """
+    Top-k rows of vectors by inner product for each query (cosine for normalized vectors)
+    
+    All queries are scored with one BLAS matrix product, then each row is partially
+    selected with argpartition so only the k winners are sorted.
+    
+    Args:
+        queries: (M, D) or (D,) query vectors
+        vectors: (N, D) matrix to search
+        k: Number of results per query
+        
+    Returns:
+        (indices, scores) arrays of shape (M, k), best first
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    scores = queries @ np.asarray(vectors, dtype=np.float32).T
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((len(queries), 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+    
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+def text_chunk_id(text: str) -> str:
+    """
+    Stable chunk ID derived from a 64-bit content hash of the text
+    
+    Unlike the built-in hash(), this is identical across processes and runs, so the
+    same text always maps to the same vector database ID.
+    """
+    return f"chunk_{hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()}"
+
+def _row_fields(emb) -> Dict[str, any]:
+    """
+    Every EmbeddingResult field except the vector, for formats that store vectors separately
+    
+    Unlike dataclasses.asdict, this neither recurses nor copies the embedding array.
+    """
+    return {
+        'chunk_id': emb.chunk_id,
+        'source_file': emb.source_file,
+        'content': emb.content,
+        'metadata': emb.metadata,
+        'model_name': emb.model_name,
+        'embedding_dim': emb.embedding_dim
+    }
+
 @dataclass
 class EmbeddingResult:
     """Represents an embedding with metadata"""
@@ -28,13 +134,138 @@ class EmbeddingResult:
     model_name: str
     embedding_dim: int
 
+@dataclass
+class EmbeddingBatch:
+    """
+    Represents many embeddings as one (N, D) float32 matrix plus per-row fields
+    
+    Scoring a query against all rows is a single matrix-vector product over the
+    matrix rather than a loop over per-row EmbeddingResult objects.
+    """
+    ids: List[str]
+    sources: List[str]
+    contents: List[str]
+    vectors: np.ndarray
+    metadata: List[Dict[str, any]]
+    model_name: str
+    embedding_dim: int
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[EmbeddingResult, 'EmbeddingBatch']:
+        """
+        Build an EmbeddingResult view of one row, or an EmbeddingBatch of a slice of rows
+        
+        Either way the vectors share the matrix memory.
+        """
+        if isinstance(index, slice):
+            return EmbeddingBatch(
+                ids=self.ids[index],
+                sources=self.sources[index],
+                contents=self.contents[index],
+                vectors=self.vectors[index],
+                metadata=self.metadata[index],
+                model_name=self.model_name,
+                embedding_dim=self.embedding_dim
+            )
+        try:
+            index = operator.index(index)
+        except TypeError:
+            raise TypeError(f"EmbeddingBatch indices must be integers or slices, not {type(index).__name__}") from None
+        return EmbeddingResult(
+            chunk_id=self.ids[index],
+            embedding=self.vectors[index],
+            source_file=self.sources[index],
+            content=self.contents[index],
+            metadata=self.metadata[index],
+            model_name=self.model_name,
+            embedding_dim=self.embedding_dim
+        )
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+    
+    def as_results(self) -> List[EmbeddingResult]:
+        """Materialize the rows as a list of EmbeddingResult objects (for list-based callers)"""
+        return list(self)
+    
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Inner-product score of every row against a query vector (cosine for normalized vectors)"""
+        query = np.asarray(query, dtype=self.vectors.dtype).reshape(-1)
+        return self.vectors @ query
+    
+    def top_k(self, query: np.ndarray, k: int = 10) -> List[tuple]:
+        """
+        Find the k highest-scoring rows for a query vector
+        
+        Returns:
+            List of (row index, score) tuples, best first
+        """
+        indices, scores = topk_cosine(query, self.vectors, k)
+        return [(int(i), float(score)) for i, score in zip(indices[0], scores[0])]
+    
+    def astype(self, dtype) -> 'EmbeddingBatch':
+        """Copy of the batch with vectors stored as dtype (e.g. np.float16 to halve memory)"""
+        return EmbeddingBatch(
+            ids=self.ids,
+            sources=self.sources,
+            contents=self.contents,
+            vectors=self.vectors.astype(dtype),
+            metadata=self.metadata,
+            model_name=self.model_name,
+            embedding_dim=self.embedding_dim
+        )
+    
+    @classmethod
+    def concatenate(cls, batches: List['EmbeddingBatch']) -> 'EmbeddingBatch':
+        """Join several batches into one, stacking their vectors into a single matrix"""
+        if not batches:
+            raise ValueError("No batches to concatenate")
+        
+        return cls(
+            ids=[i for b in batches for i in b.ids],
+            sources=[s for b in batches for s in b.sources],
+            contents=[c for b in batches for c in b.contents],
+            vectors=np.concatenate([b.vectors for b in batches], axis=0),
+            metadata=[m for b in batches for m in b.metadata],
+            model_name=batches[0].model_name,
+            embedding_dim=batches[0].embedding_dim
+        )
+
+# Default location of the persistent embedding cache (project-level .cache directory)
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / ".cache" / "embeddings.sqlite3"
+
+# Supported model weight precisions (fp32 by default; 'auto' opts in to the fastest for the device)
+PRECISIONS = ('auto', 'fp32', 'fp16', 'bf16', 'int8')
+
+# Header marker of pickle files whose vector buffers follow the pickle stream
+PICKLE_OOB_FORMAT = 'pickle5-oob'
+
+# Supported inference runtimes
+BACKENDS = ('torch', 'onnx')
+
+# Where ONNX exports are saved (one subdirectory per model) so later runs skip the export
+ONNX_EXPORT_DIR = Path(__file__).resolve().parent.parent / ".cache" / "onnx"
+
+# Number of in-session single-text embeddings kept in memory
+QUERY_CACHE_SIZE = 4096
+
 class ClaimsEmbeddingsGenerator:
     """Generates embeddings for claims data using BGE model"""
     
     def __init__(self, 
                  model_name: str = "BAAI/bge-large-en-v1.5",
                  device: str = "auto",
-                 normalize_embeddings: bool = True):
+                 normalize_embeddings: bool = True,
+                 cache_path: Optional[str] = None,
+                 use_cache: bool = True,
+                 precision: str = "fp32",
+                 backend: str = "torch",
+                 output_dim: Optional[int] = None,
+                 projection_path: Optional[str] = None,
+                 compile_model: bool = False):
         """
         Initialize the embeddings generator
         
@@ -42,6 +273,18 @@ class ClaimsEmbeddingsGenerator:
             model_name: Name of the sentence transformer model to use
             device: Device to run the model on ('cpu', 'cuda', 'auto')
             normalize_embeddings: Whether to normalize embeddings to unit length
+            cache_path: SQLite file for the persistent embedding cache (defaults to .cache/embeddings.sqlite3)
+            use_cache: Whether to reuse embeddings of texts that were already encoded
+            precision: Model weight precision ('auto', 'fp32', 'fp16', 'bf16', 'int8');
+                defaults to fp32 so vectors match existing indexes. Reduced precision is
+                opt-in: 'auto' uses bf16/fp16 on CUDA and dynamic int8 quantization on CPU
+            backend: Inference runtime ('torch' for sentence-transformers or 'onnx' for ONNX Runtime)
+            output_dim: Keep only the first output_dim dimensions of each vector (re-normalized);
+                best suited to Matryoshka-trained models, check recall before using it with BGE
+            projection_path: .npz file from fit_pca_projection; vectors are projected onto its
+                PCA components instead of truncated (takes precedence over output_dim)
+            compile_model: Compile the transformer with torch.compile (PyTorch 2.1+, torch backend);
+                falls back to eager mode if compilation fails
         """
         self.model_name = model_name
         self.normalize_embeddings = normalize_embeddings
@@ -56,27 +299,367 @@ class ClaimsEmbeddingsGenerator:
         self.logger.info(f"Initializing embeddings generator with model: {model_name}")
         self.logger.info(f"Using device: {self.device}")
         
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported backend: {backend}. Supported: {', '.join(BACKENDS)}")
+        if backend == "onnx" and not ONNX_AVAILABLE:
+            raise ImportError("optimum[onnxruntime] package is required for the onnx backend. "
+                              "Install with: pip install optimum[onnxruntime]")
+        self.backend = backend
+        
+        if backend == "onnx":
+            # The exported graph runs in float32; precision casts apply to the torch model only
+            if precision not in ("auto", "fp32"):
+                self.logger.warning(f"precision={precision} is ignored by the onnx backend")
+            self.precision = "fp32"
+        else:
+            self.precision = self._resolve_precision(precision)
+        
+        # Optional dimension reduction applied to every encoded vector
+        self.compile_model = compile_model
+        self.output_dim = output_dim
+        self.projection = None
+        self.projection_mean = None
+        self._reduction_tag = f"trunc{output_dim}" if output_dim else "full"
+        if projection_path:
+            self._load_projection(projection_path)
+        
         # Load the model
         self.model = None
         self.embedding_dim = None
+        self.batch_size = None
         self._load_model()
+        
+        # Persistent cache of vectors keyed by SHA-256 of model settings and text
+        self.cache = None
+        self._cache_lock = threading.Lock()
+        if use_cache:
+            self._open_cache(Path(cache_path) if cache_path else DEFAULT_CACHE_PATH)
+        
+        # Per-instance memo for repeated single texts (e.g. search queries)
+        self._embed_text = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._embed_text_uncached)
+    
+    def _open_cache(self, cache_path: Path):
+        """Open (or create) the SQLite embedding cache; caching is disabled if this fails"""
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self.cache = sqlite3.connect(str(cache_path), check_same_thread=False)
+            self.cache.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (hash BLOB PRIMARY KEY, vec BLOB NOT NULL)"
+            )
+            self.cache.commit()
+            self.logger.info(f"Embedding cache: {cache_path}")
+        except Exception as e:
+            self.logger.warning(f"Embedding cache disabled: {str(e)}")
+            self.cache = None
+    
+    def _cache_key(self, text: str) -> bytes:
+        """SHA-256 digest identifying a text's embedding under the current model settings"""
+        return hashlib.sha256(
+            f"{self.model_name}|{self.backend}|{self.precision}|{self._reduction_tag}|"
+            f"{self.normalize_embeddings}|{text}".encode('utf-8')
+        ).digest()
+    
+    def _encode(self, texts: List[str], batch_size: Optional[int] = None,
+                show_progress_bar: bool = False) -> np.ndarray:
+        """Run the model on texts and return an (N, D) float32 matrix"""
+        batch_size = batch_size or self.batch_size
+        
+        # Encode each distinct text once (boilerplate headers repeat a lot), then scatter back
+        unique_texts, inverse = np.unique(np.asarray(texts, dtype=object), return_inverse=True)
+        
+        vectors = self._reduce(self._forward(list(unique_texts), batch_size, show_progress_bar))
+        return vectors[inverse.reshape(-1)]
+    
+    def _reduce(self, vectors: np.ndarray) -> np.ndarray:
+        """Apply the configured PCA projection or truncation, re-normalizing the result"""
+        if self.projection is not None:
+            vectors = (vectors - self.projection_mean) @ self.projection.T
+        elif self.output_dim:
+            vectors = vectors[:, :self.output_dim]
+        else:
+            return vectors
+        
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        return self._normalize(vectors) if self.normalize_embeddings else vectors
+    
+    def _load_projection(self, projection_path: str):
+        """Load PCA components saved by fit_pca_projection"""
+        data = np.load(projection_path)
+        self.projection = np.asarray(data['components'], dtype=np.float32)
+        self.projection_mean = np.asarray(data['mean'], dtype=np.float32)
+        self.output_dim = self.projection.shape[0]
+        self._reduction_tag = "pca" + hashlib.sha256(self.projection.tobytes()).hexdigest()[:16]
+        self.logger.info(f"Loaded PCA projection to {self.output_dim} dimensions from {projection_path}")
+    
+    def fit_pca_projection(self, sample_texts: List[str], output_dim: int, output_path: str) -> str:
+        """
+        Fit a PCA projection on a representative sample of texts and save it
+        
+        Pass the saved file as projection_path to a new generator to use it.
+        
+        Args:
+            sample_texts: Texts representative of the corpus (at least output_dim of them)
+            output_dim: Number of dimensions to keep
+            output_path: Path of the .npz file to write
+            
+        Returns:
+            Path to the saved projection
+        """
+        from sklearn.decomposition import PCA
+        
+        full_vectors = self._forward(sample_texts, self.batch_size)
+        pca = PCA(n_components=output_dim).fit(full_vectors)
+        
+        output_path = Path(output_path).with_suffix('.npz')
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(output_path, components=pca.components_.astype(np.float32),
+                 mean=pca.mean_.astype(np.float32))
+        
+        self.logger.info(f"Saved PCA projection ({full_vectors.shape[1]} -> {output_dim} dims, "
+                         f"{pca.explained_variance_ratio_.sum():.1%} variance kept) to {output_path}")
+        return str(output_path)
+    
+    def _forward(self, texts: List[str], batch_size: int,
+                 show_progress_bar: bool = False) -> np.ndarray:
+        """Run the loaded backend on texts and return an (N, D) float32 matrix"""
+        if self.backend == "onnx":
+            return self._forward_onnx(texts, batch_size)
+        
+        # numpy has no bfloat16, so take tensors and upcast before converting
+        vectors = self.model.encode(
+            texts,
+            normalize_embeddings=self.normalize_embeddings,
+            convert_to_tensor=True,
+            batch_size=batch_size,  # Process in batches for memory efficiency
+            show_progress_bar=show_progress_bar
+        )
+        return vectors.float().cpu().numpy()
+    
+    def _forward_onnx(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """
+        Encode texts with the ONNX Runtime session
+        
+        BGE models use the [CLS] token's hidden state as the sentence embedding (the same
+        pooling sentence-transformers applies), followed by optional L2 normalization.
+        
+        Texts are tokenized once without padding and batched in order of token length,
+        so each batch is padded only to its own longest member rather than to the
+        longest text overall (attention cost grows with the square of padded length).
+        """
+        encodings = self.tokenizer(texts, truncation=True, max_length=self.max_seq_length)
+        order = np.argsort([len(ids) for ids in encodings['input_ids']], kind='stable')
+        
+        vectors = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            batch_indices = order[start:start + batch_size]
+            inputs = self.tokenizer.pad(
+                {key: [values[i] for i in batch_indices] for key, values in encodings.items()},
+                return_tensors="np"
+            )
+            last_hidden = self.model(**inputs).last_hidden_state
+            pooled = np.asarray(last_hidden[:, 0], dtype=np.float32)
+            if vectors.shape[1] == 0:
+                vectors = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            # Scatter back to the caller's order
+            vectors[batch_indices] = pooled
+        
+        if self.normalize_embeddings:
+            vectors = self._normalize(vectors)
+        return vectors
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize rows (in place; callers pass freshly computed arrays)"""
+        return l2_normalize_rows(vectors)
+    
+    def _encode_with_cache(self, texts: List[str], batch_size: Optional[int] = None,
+                           show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Encode texts, running the model only on texts missing from the persistent cache
+        
+        Args:
+            texts: List of texts to embed
+            batch_size: Number of texts passed to the model per forward pass (defaults to self.batch_size)
+            show_progress_bar: Whether the model shows a progress bar for the misses
+            
+        Returns:
+            (N, D) float32 matrix in the order of texts
+        """
+        if self.cache is None or not texts:
+            return self._encode(texts, batch_size, show_progress_bar)
+        
+        keys = [self._cache_key(text) for text in texts]
+        
+        # Look up known vectors (in groups to stay under SQLite's bound-parameter limit)
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._cache_lock:
+            for start in range(0, len(unique_keys), 500):
+                group = unique_keys[start:start + 500]
+                rows = self.cache.execute(
+                    f"SELECT hash, vec FROM embeddings WHERE hash IN ({','.join('?' * len(group))})",
+                    group
+                )
+                found.update(rows.fetchall())
+        
+        vectors = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+        miss_positions = {}
+        for i, key in enumerate(keys):
+            if key in found:
+                vectors[i] = np.frombuffer(found[key], dtype=np.float32)
+            else:
+                miss_positions.setdefault(key, []).append(i)
+        
+        if miss_positions:
+            miss_texts = [texts[positions[0]] for positions in miss_positions.values()]
+            encoded = self._encode(miss_texts, batch_size, show_progress_bar)
+            for positions, vector in zip(miss_positions.values(), encoded):
+                vectors[positions] = vector
+            
+            with self._cache_lock:
+                self.cache.executemany(
+                    "INSERT OR IGNORE INTO embeddings (hash, vec) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in zip(miss_positions, encoded)]
+                )
+                self.cache.commit()
+        
+        self.logger.info(f"Embedding cache: {len(texts) - sum(map(len, miss_positions.values()))} hits, "
+                         f"{len(miss_positions)} texts encoded")
+        return vectors
+    
+    def _embed_text_uncached(self, text: str) -> np.ndarray:
+        """Embed one text; wrapped in a per-instance lru_cache as _embed_text"""
+        vector = self._encode_with_cache([text])[0]
+        # The memoized array is shared between callers, so guard it against in-place edits
+        vector.setflags(write=False)
+        return vector
     
     def _load_model(self):
-        """Load the sentence transformer model"""
+        """Load the sentence transformer model (or its ONNX export for the onnx backend)"""
         try:
-            self.logger.info("Loading sentence transformer model...")
-            self.model = SentenceTransformer(self.model_name, device=self.device)
+            if self.backend == "onnx":
+                self._load_onnx_model()
+                self.max_seq_length = min(self.tokenizer.model_max_length, 512)
+            else:
+                self.logger.info("Loading sentence transformer model...")
+                self.model = SentenceTransformer(self.model_name, device=self.device)
+                self._apply_precision()
             
             # Get embedding dimension
-            test_embedding = self.model.encode(["test"], normalize_embeddings=self.normalize_embeddings)
+            test_embedding = self._reduce(self._forward(["test"], batch_size=1))
             self.embedding_dim = test_embedding.shape[1]
             
-            self.logger.info(f"Model loaded successfully. Embedding dimension: {self.embedding_dim}")
+            self.batch_size = self._auto_batch_size()
+            
+            if self.compile_model and self.backend == "torch":
+                self._compile_transformer()
+            
+            self.logger.info(f"Model loaded successfully. Embedding dimension: {self.embedding_dim}, "
+                             f"batch size: {self.batch_size}")
             
         except Exception as e:
             self.logger.error(f"Failed to load model {self.model_name}: {str(e)}")
             raise
     
+    def _compile_transformer(self):
+        """
+        Replace the transformer with a torch.compile'd version, warmed up at full batch size
+        
+        Compilation happens on the first call, so the warm-up encode both primes the
+        shapes seen in production (max-length chunks, full batches) and surfaces any
+        compile error, in which case the eager module is restored.
+        """
+        version = tuple(int(part) for part in torch.__version__.split('+')[0].split('.')[:2])
+        if version < (2, 1):
+            self.logger.warning(f"torch.compile needs PyTorch 2.1+, found {torch.__version__}; using eager mode")
+            return
+        
+        transformer = self.model[0]
+        eager_model = transformer.auto_model
+        try:
+            transformer.auto_model = torch.compile(eager_model, mode="reduce-overhead", dynamic=False)
+            self.model.encode(["x" * 1000] * self.batch_size, batch_size=self.batch_size,
+                              normalize_embeddings=self.normalize_embeddings)
+            self.logger.info("Transformer compiled with torch.compile (reduce-overhead)")
+        except Exception as e:
+            transformer.auto_model = eager_model
+            self.logger.warning(f"torch.compile failed, using eager mode: {str(e)}")
+    
+    def _load_onnx_model(self):
+        """Load the ONNX export of the model, exporting and saving it on first use"""
+        provider = "CUDAExecutionProvider" if self.device.startswith("cuda") else "CPUExecutionProvider"
+        export_dir = ONNX_EXPORT_DIR / self.model_name.replace("/", "--")
+        
+        if (export_dir / "model.onnx").exists():
+            self.logger.info(f"Loading ONNX Runtime model from {export_dir}...")
+            self.tokenizer = AutoTokenizer.from_pretrained(str(export_dir))
+            self.model = ORTModelForFeatureExtraction.from_pretrained(str(export_dir), provider=provider)
+            return
+        
+        self.logger.info("Exporting model to ONNX (first use only)...")
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(self.model_name, export=True, provider=provider)
+        try:
+            export_dir.mkdir(parents=True, exist_ok=True)
+            # Tokenizer first: model.onnx marks a complete export
+            self.tokenizer.save_pretrained(str(export_dir))
+            self.model.save_pretrained(str(export_dir))
+            self.logger.info(f"Saved ONNX export to {export_dir}")
+        except Exception as e:
+            self.logger.warning(f"Could not save ONNX export, it will be redone next time: {str(e)}")
+    
+    def _resolve_precision(self, precision: str) -> str:
+        """Map 'auto' to the fastest supported precision for the device"""
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unsupported precision: {precision}. Supported: {', '.join(PRECISIONS)}")
+        
+        if precision != "auto":
+            return precision
+        if self.device.startswith("cuda"):
+            return "bf16" if torch.cuda.is_bf16_supported() else "fp16"
+        return "int8"
+    
+    def _apply_precision(self):
+        """Cast or quantize the loaded model weights to self.precision"""
+        if self.precision == "fp16":
+            self.model = self.model.half()
+        elif self.precision == "bf16":
+            self.model = self.model.to(torch.bfloat16)
+        elif self.precision == "int8":
+            # Dynamic quantization stores Linear weights as int8 and quantizes activations on the fly
+            transformer = self.model[0]
+            transformer.auto_model = torch.ao.quantization.quantize_dynamic(
+                transformer.auto_model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        
+        self.logger.info(f"Model precision: {self.precision}")
+    
+    def _auto_batch_size(self) -> int:
+        """
+        Pick an encode batch size for the device
+        
+        Large GPUs fit far bigger batches than the old fixed 32, while small CPUs are
+        better off with about one text per core. sentence-transformers already sorts
+        each call's texts by length, so padding waste stays low at larger sizes.
+        """
+        if self.device.startswith("cuda"):
+            device_index = torch.device(self.device).index or 0
+            vram_gb = torch.cuda.get_device_properties(device_index).total_memory / 1024 ** 3
+            return 256 if vram_gb >= 16 else 64
+        return max(8, os.cpu_count() or 1)
+    
+    def embed_query(self, text: str) -> np.ndarray:
+        """
+        Embed a search query, memoized per model for repeated queries
+        
+        Args:
+            text: Query text
+            
+        Returns:
+            Read-only embedding vector, shared with other callers of the same text
+        """
+        return self._embed_text(text)
+    
     def generate_embedding(self, text: str, chunk_id: str = None, 
                           metadata: Dict = None) -> EmbeddingResult:
         """
@@ -91,16 +674,12 @@ class ClaimsEmbeddingsGenerator:
             EmbeddingResult object
         """
         try:
-            # Generate embedding
-            embedding = self.model.encode(
-                [text], 
-                normalize_embeddings=self.normalize_embeddings,
-                convert_to_numpy=True
-            )[0]
+            # Generate embedding (repeated texts are served from the cache)
+            embedding = self._embed_text(text)
             
             # Create result
             result = EmbeddingResult(
-                chunk_id=chunk_id or f"chunk_{hash(text) % 1000000}",
+                chunk_id=chunk_id or text_chunk_id(text),
                 embedding=embedding,
                 source_file=metadata.get('source_file', 'unknown') if metadata else 'unknown',
                 content=text,
@@ -115,65 +694,79 @@ class ClaimsEmbeddingsGenerator:
             self.logger.error(f"Failed to generate embedding: {str(e)}")
             raise
     
-    def generate_embeddings_batch(self, texts: List[str], 
-                                 chunk_ids: List[str] = None,
-                                 metadata_list: List[Dict] = None) -> List[EmbeddingResult]:
+    def encode_batch(self, texts: List[str], 
+                     chunk_ids: List[str] = None,
+                     metadata_list: List[Dict] = None,
+                     batch_size: Optional[int] = None) -> EmbeddingBatch:
         """
-        Generate embeddings for multiple texts in batch
+        Generate embeddings for multiple texts as a single EmbeddingBatch
         
         Args:
             texts: List of texts to embed
             chunk_ids: List of chunk IDs (optional)
             metadata_list: List of metadata dictionaries (optional)
+            batch_size: Number of texts passed to the model per forward pass (defaults to self.batch_size)
             
         Returns:
-            List of EmbeddingResult objects
+            EmbeddingBatch holding an (N, D) float32 matrix
         """
         try:
             self.logger.info(f"Generating embeddings for {len(texts)} texts...")
             
-            # Generate embeddings in batch
-            embeddings = self.model.encode(
-                texts,
-                normalize_embeddings=self.normalize_embeddings,
-                convert_to_numpy=True,
-                batch_size=32,  # Process in batches for memory efficiency
-                show_progress_bar=True
-            )
+            # Generate embeddings in batch, skipping texts already in the cache
+            vectors = self._encode_with_cache(texts, batch_size=batch_size, show_progress_bar=True)
             
-            # Create results
-            results = []
-            for i, (text, embedding) in enumerate(zip(texts, embeddings)):
-                chunk_id = chunk_ids[i] if chunk_ids and i < len(chunk_ids) else f"chunk_{i}"
-                metadata = metadata_list[i] if metadata_list and i < len(metadata_list) else {}
-                
-                result = EmbeddingResult(
-                    chunk_id=chunk_id,
-                    embedding=embedding,
-                    source_file=metadata.get('source_file', 'unknown'),
-                    content=text,
-                    metadata=metadata,
-                    model_name=self.model_name,
-                    embedding_dim=self.embedding_dim
-                )
-                results.append(result)
+            ids = []
+            metadata_rows = []
+            for i in range(len(texts)):
+                ids.append(chunk_ids[i] if chunk_ids and i < len(chunk_ids) else f"chunk_{i}")
+                metadata_rows.append(metadata_list[i] if metadata_list and i < len(metadata_list) else {})
             
-            self.logger.info(f"Successfully generated {len(results)} embeddings")
-            return results
+            batch = EmbeddingBatch(
+                ids=ids,
+                sources=[m.get('source_file', 'unknown') for m in metadata_rows],
+                contents=list(texts),
+                vectors=vectors,
+                metadata=metadata_rows,
+                model_name=self.model_name,
+                embedding_dim=self.embedding_dim
+            )
+            
+            self.logger.info(f"Successfully generated {len(batch)} embeddings")
+            return batch
             
         except Exception as e:
             self.logger.error(f"Failed to generate batch embeddings: {str(e)}")
             raise
     
-    def generate_embeddings_from_chunks(self, chunks: List) -> List[EmbeddingResult]:
+    def generate_embeddings_batch(self, texts: List[str], 
+                                 chunk_ids: List[str] = None,
+                                 metadata_list: List[Dict] = None,
+                                 batch_size: Optional[int] = None) -> List[EmbeddingResult]:
+        """
+        Generate embeddings for multiple texts in batch
+        
+        Args:
+            texts: List of texts to embed
+            chunk_ids: List of chunk IDs (optional)
+            metadata_list: List of metadata dictionaries (optional)
+            batch_size: Number of texts passed to the model per forward pass (defaults to self.batch_size)
+            
+        Returns:
+            List of EmbeddingResult objects
+        """
+        return self.encode_batch(texts, chunk_ids, metadata_list, batch_size=batch_size).as_results()
+    
+    def generate_embeddings_from_chunks(self, chunks: List, batch_size: Optional[int] = None) -> EmbeddingBatch:
         """
         Generate embeddings from TextChunk objects
         
         Args:
             chunks: List of TextChunk objects
+            batch_size: Number of chunks passed to the model per forward pass (defaults to self.batch_size)
             
         Returns:
-            List of EmbeddingResult objects
+            EmbeddingBatch (iterating it yields EmbeddingResult objects)
         """
         texts = [chunk.content for chunk in chunks]
         chunk_ids = [chunk.chunk_id for chunk in chunks]
@@ -190,7 +783,7 @@ class ClaimsEmbeddingsGenerator:
             }
             metadata_list.append(metadata)
         
-        return self.generate_embeddings_batch(texts, chunk_ids, metadata_list)
+        return self.encode_batch(texts, chunk_ids, metadata_list, batch_size=batch_size)
     
     def save_embeddings(self, embeddings: List[EmbeddingResult], 
                        output_path: str, 
@@ -201,7 +794,8 @@ class ClaimsEmbeddingsGenerator:
         Args:
             embeddings: List of EmbeddingResult objects
             output_path: Path to save the embeddings
-            format: Format to save in ('json', 'pickle', 'numpy')
+            format: Format to save in ('json', 'pickle', 'numpy', 'npy');
+                'npy' writes float16 vectors to <name>.npy plus a <name>.meta.json sidecar
             
         Returns:
             Path to saved file
@@ -211,12 +805,12 @@ class ClaimsEmbeddingsGenerator:
         
         try:
             if format.lower() == "json":
-                # Convert to JSON-serializable format
+                # Convert to JSON-serializable format (orjson serializes numpy arrays natively)
                 data = []
                 for emb in embeddings:
                     emb_data = {
                         'chunk_id': emb.chunk_id,
-                        'embedding': emb.embedding.tolist(),
+                        'embedding': emb.embedding if ORJSON_AVAILABLE else emb.embedding.tolist(),
                         'source_file': emb.source_file,
                         'content': emb.content,
                         'metadata': emb.metadata,
@@ -225,22 +819,65 @@ class ClaimsEmbeddingsGenerator:
                     }
                     data.append(emb_data)
                 
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                if ORJSON_AVAILABLE:
+                    output_path.write_bytes(orjson.dumps(
+                        data,
+                        option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                    ))
+                else:
+                    with open(output_path, 'w', encoding='utf-8') as f:
+                        json.dump(data, f, indent=2, ensure_ascii=False)
             
             elif format.lower() == "pickle":
+                # Protocol 5 hands the vector buffers out-of-band, so they are written as-is
+                # after the pickle stream instead of being copied into it
+                buffers = []
+                payload = pickle.dumps(embeddings, protocol=5, buffer_callback=buffers.append)
+                raw_buffers = [buffer.raw() for buffer in buffers]
+                header = {
+                    'format': PICKLE_OOB_FORMAT,
+                    'payload_size': len(payload),
+                    'buffer_sizes': [raw.nbytes for raw in raw_buffers]
+                }
                 with open(output_path, 'wb') as f:
-                    pickle.dump(embeddings, f)
+                    pickle.dump(header, f, protocol=5)
+                    f.write(payload)
+                    for raw in raw_buffers:
+                        f.write(raw)
             
             elif format.lower() == "numpy":
-                # Save as numpy arrays
-                embeddings_array = np.array([emb.embedding for emb in embeddings])
-                metadata = [asdict(emb) for emb in embeddings]
+                # Save as one float16 matrix, filled in place rather than via an intermediate list
+                embeddings_array = getattr(embeddings, 'vectors', None)
+                if embeddings_array is not None:
+                    embeddings_array = embeddings_array.astype(np.float16)
+                else:
+                    embeddings_array = np.empty((len(embeddings), self.embedding_dim), dtype=np.float16)
+                    for i, emb in enumerate(embeddings):
+                        embeddings_array[i] = emb.embedding
+                
+                # Row metadata without the vector, which is already in the matrix
+                metadata = [_row_fields(emb) for emb in embeddings]
                 
                 np.savez(output_path, 
                         embeddings=embeddings_array,
                         metadata=metadata)
             
+            elif format.lower() == "npy":
+                # One contiguous float16 matrix (a single bulk write) plus row metadata without vectors
+                vectors = getattr(embeddings, 'vectors', None)
+                if vectors is None:
+                    vectors = np.stack([emb.embedding for emb in embeddings])
+                np.save(output_path.with_suffix('.npy'), vectors.astype(np.float16))
+                
+                rows = [_row_fields(emb) for emb in embeddings]
+                metadata_path = output_path.with_suffix('.meta.json')
+                if ORJSON_AVAILABLE:
+                    metadata_path.write_bytes(orjson.dumps(rows, option=orjson.OPT_NON_STR_KEYS))
+                else:
+                    with open(metadata_path, 'w', encoding='utf-8') as f:
+                        json.dump(rows, f, ensure_ascii=False)
+                output_path = output_path.with_suffix('.npy')
+            
             else:
                 raise ValueError(f"Unsupported format: {format}")
             
@@ -257,17 +894,21 @@ class ClaimsEmbeddingsGenerator:
         
         Args:
             file_path: Path to the embeddings file
-            format: Format of the file ('json', 'pickle', 'numpy')
+            format: Format of the file ('json', 'pickle', 'numpy', 'npy')
             
         Returns:
-            List of EmbeddingResult objects
+            List of EmbeddingResult objects ('npy' returns an EmbeddingBatch whose
+            vectors are a read-only float16 memory map)
         """
         file_path = Path(file_path)
         
         try:
             if format.lower() == "json":
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                if ORJSON_AVAILABLE:
+                    data = orjson.loads(file_path.read_bytes())
+                else:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
                 
                 embeddings = []
                 for item in data:
@@ -284,13 +925,27 @@ class ClaimsEmbeddingsGenerator:
             
             elif format.lower() == "pickle":
                 with open(file_path, 'rb') as f:
-                    embeddings = pickle.load(f)
+                    header = pickle.load(f)
+                    if isinstance(header, dict) and header.get('format') == PICKLE_OOB_FORMAT:
+                        payload = f.read(header['payload_size'])
+                        buffers = []
+                        for size in header['buffer_sizes']:
+                            # bytearray keeps the restored arrays writable
+                            buffer = bytearray(size)
+                            f.readinto(buffer)
+                            buffers.append(buffer)
+                        embeddings = pickle.loads(payload, buffers=buffers)
+                    else:
+                        # Files written before out-of-band buffers hold the embeddings directly
+                        embeddings = header
             
             elif format.lower() == "numpy":
                 data = np.load(file_path, allow_pickle=True)
                 embeddings = []
                 
-                for i, (emb_array, metadata) in enumerate(zip(data['embeddings'], data['metadata'])):
+                # Widen the stored float16 matrix back to float32 in one pass
+                vectors = data['embeddings'].astype(np.float32)
+                for i, (emb_array, metadata) in enumerate(zip(vectors, data['metadata'])):
                     emb = EmbeddingResult(
                         chunk_id=metadata['chunk_id'],
                         embedding=emb_array,
@@ -302,6 +957,26 @@ class ClaimsEmbeddingsGenerator:
                     )
                     embeddings.append(emb)
             
+            elif format.lower() == "npy":
+                # Vectors stay on disk until rows are touched; metadata comes from the sidecar
+                vectors = np.load(file_path.with_suffix('.npy'), mmap_mode='r')
+                metadata_path = file_path.with_suffix('.meta.json')
+                if ORJSON_AVAILABLE:
+                    rows = orjson.loads(metadata_path.read_bytes())
+                else:
+                    with open(metadata_path, 'r', encoding='utf-8') as f:
+                        rows = json.load(f)
+                
+                embeddings = EmbeddingBatch(
+                    ids=[row['chunk_id'] for row in rows],
+                    sources=[row['source_file'] for row in rows],
+                    contents=[row['content'] for row in rows],
+                    vectors=vectors,
+                    metadata=[row['metadata'] for row in rows],
+                    model_name=rows[0]['model_name'] if rows else self.model_name,
+                    embedding_dim=rows[0]['embedding_dim'] if rows else self.embedding_dim
+                )
+            
             else:
                 raise ValueError(f"Unsupported format: {format}")
             
@@ -318,7 +993,12 @@ class ClaimsEmbeddingsGenerator:
             'model_name': self.model_name,
             'device': self.device,
             'embedding_dim': self.embedding_dim,
-            'normalize_embeddings': self.normalize_embeddings
+            'batch_size': self.batch_size,
+            'precision': self.precision,
+            'backend': self.backend,
+            'output_dim': self.output_dim,
+            'normalize_embeddings': self.normalize_embeddings,
+            'cache_enabled': self.cache is not None
         }
 
 def main():
@@ -1,34 +1,141 @@
 import os
 import mimetypes
-import speech_recognition as sr
-from pydub import AudioSegment
-import PyPDF2
-import pdfplumber  # Alternative to PyMuPDF - more Windows-friendly
-import cv2
-import pytesseract
-from PIL import Image
+import importlib.util
 import tempfile
+import uuid
 import wave
 import json
 import shutil
+import subprocess
+import threading
+from functools import lru_cache
+import queue
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+# The media/OCR/PDF libraries are imported inside the functions that use them, so a
+# process that only handles text files (or a freshly started worker) doesn't pay for
+# loading OpenCV, pydub, pdfplumber, ... Optional backends are detected without importing.
+PYMUPDF_AVAILABLE = importlib.util.find_spec("fitz") is not None  # PyMuPDF: much faster text extraction than pdfplumber
+TESSEROCR_AVAILABLE = importlib.util.find_spec("tesserocr") is not None  # Keeps one Tesseract instance loaded across frames
+FASTER_WHISPER_AVAILABLE = importlib.util.find_spec("faster_whisper") is not None  # Local CTranslate2 Whisper speech recognition
+
+# Heavy modules to import ahead of time where worker processes share a preloaded parent
+HEAVY_MODULES = ("numpy", "cv2", "pytesseract", "pdfplumber", "pydub", "speech_recognition")
+
+# Speech recognition backends, and the faster-whisper model size and concurrent
+# transcriptions per loaded model
+STT_BACKENDS = ('auto', 'google', 'whisper')
+WHISPER_MODEL_SIZE = "small"
+WHISPER_WORKERS = 4
+
+# CPU threads per Whisper model in folder pool workers (each worker loads its own model)
+WHISPER_POOL_WORKER_THREADS = 1
+
+# VAD chunks decoded together per batch by faster-whisper's batched pipeline
+WHISPER_BATCH_SIZE = 16
+
+# File extension -> file type handled by FileTextExtractor
+_EXT_MAP = {
+    '.wav': 'audio',
+    '.mp3': 'audio',
+    '.mpeg': 'audio',
+    '.mp4': 'video',
+    '.avi': 'video',
+    '.mov': 'video',
+    '.mkv': 'video',
+    '.txt': 'text',
+    '.pdf': 'pdf'
+}
+
+@lru_cache(maxsize=4096)
+def _detect_file_type(file_path):
+    """Detect file type based on extension, falling back to MIME type (cached per path)"""
+    file_ext = os.path.splitext(file_path)[1].lower()
+    
+    if file_ext in _EXT_MAP:
+        return _EXT_MAP[file_ext]
+    
+    # Fallback to MIME type detection
+    mime_type, _ = mimetypes.guess_type(file_path)
+    if mime_type:
+        if mime_type.startswith('audio/'):
+            return 'audio'
+        elif mime_type.startswith('video/'):
+            return 'video'
+        elif mime_type == 'text/plain':
+            return 'text'
+        elif mime_type == 'application/pdf':
+            return 'pdf'
+    
+    return 'unknown'
 
 class FileTextExtractor:
-    def __init__(self):
-        self.supported_extensions = {
-            '.wav': 'audio',
-            '.mp3': 'audio', 
-            '.mpeg': 'audio',
-            '.mp4': 'video',
-            '.avi': 'video',
-            '.mov': 'video',
-            '.mkv': 'video',
-            '.txt': 'text',
-            '.pdf': 'pdf'
-        }
+    def __init__(self, stt_backend="google", whisper_model=WHISPER_MODEL_SIZE, warmup=False,
+                 whisper_threads=0, pdf_workers=None):
+        """
+        Args:
+            stt_backend: Speech recognition backend: 'google' (web API, the default),
+                'whisper' (local faster-whisper), or 'auto' (whisper if faster-whisper
+                is installed). Whisper downloads its model on first use, so it is opt-in.
+            whisper_model: faster-whisper model size or path
+            whisper_threads: CPU threads for the Whisper model (0 lets CTranslate2 decide)
+            pdf_workers: Processes for extracting one large PDF (None uses one per CPU, 1
+                extracts serially; pool workers pass 1 so pools do not nest)
+            warmup: Load and warm up the speech backend now instead of on the first file
+                (for long-running processes that will transcribe audio)
+        """
+        if stt_backend not in STT_BACKENDS:
+            raise ValueError(f"Unknown stt_backend '{stt_backend}', expected one of {STT_BACKENDS}")
+        if stt_backend == "whisper" and not FASTER_WHISPER_AVAILABLE:
+            raise ImportError("faster-whisper is required for stt_backend='whisper'. Install with: pip install faster-whisper")
+        if stt_backend == "auto":
+            stt_backend = "whisper" if FASTER_WHISPER_AVAILABLE else "google"
+        
+        self.supported_extensions = _EXT_MAP
+        self.stt_backend = stt_backend
+        self.whisper_model = whisper_model
+        self.whisper_threads = whisper_threads
+        self.pdf_workers = pdf_workers or os.cpu_count() or 1
+        
+        # Scratch directory for this extractor's temp WAVs; removed when the extractor is
+        # garbage-collected or the process exits, even if a file was left behind by a crash
+        self._tmp = tempfile.TemporaryDirectory(prefix="fte_")
+        
+        # Whisper model, loaded on first use and shared by all threads of this extractor
+        self._stt = None
+        self._stt_batched = False
+        self._stt_lock = threading.Lock()
         
         # Create necessary directories
         self.ensure_directories()
         
+        if warmup:
+            self.warmup()
+        
+    def warmup(self):
+        """
+        Take the speech backend's one-time costs off the first file's critical path
+        
+        Whisper: load the model and transcribe one second of silence, which allocates
+        the inference buffers. Google: create this thread's recognizer (a request to the
+        web API would only spend quota).
+        """
+        import numpy as np
+        
+        if self.stt_backend == "whisper":
+            try:
+                model = self._load_whisper()
+                segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1)
+                list(segments)  # transcription is lazy; consume it to actually run the model
+            except Exception as e:
+                print(f"⚠️  Warning: Whisper warmup failed: {e}")
+        else:
+            _thread_recognizer()
+        
+    def _temp_path(self, suffix):
+        """Return a fresh, unique path inside this extractor's scratch directory"""
+        return os.path.join(self._tmp.name, f"{uuid.uuid4().hex}{suffix}")
+    
     def ensure_directories(self):
         """Create necessary directories for processing"""
         dirs = ['extracted_audio', 'video_audio_segments', 'video_audio_results']
@@ -38,162 +145,236 @@ class FileTextExtractor:
         
     def detect_file_type(self, file_path):
         """Detect file type based on extension and MIME type"""
-        file_ext = os.path.splitext(file_path)[1].lower()
-        
-        if file_ext in self.supported_extensions:
-            return self.supported_extensions[file_ext]
-        
-        # Fallback to MIME type detection
-        mime_type, _ = mimetypes.guess_type(file_path)
-        if mime_type:
-            if mime_type.startswith('audio/'):
-                return 'audio'
-            elif mime_type.startswith('video/'):
-                return 'video'
-            elif mime_type == 'text/plain':
-                return 'text'
-            elif mime_type == 'application/pdf':
-                return 'pdf'
-        
-        return 'unknown'
+        return _detect_file_type(file_path)
     
     def extract_text_from_audio(self, file_path):
         """Extract text from audio files using speech recognition with enhanced handling"""
-        temp_files = []
+        if self.stt_backend == "whisper":
+            return self._transcribe_whisper(file_path)
+        
+        # Short 16kHz mono 16-bit WAVs can be fed to the recognizer as-is, skipping ffmpeg
+        if _is_stt_ready_wav(file_path):
+            try:
+                return self._recognize_from_wav_path(file_path)
+            except Exception:
+                pass
+        
+        # Convert straight to a recognizer-ready WAV with ffmpeg, without decoding into Python
+        result = self._recognize_with_ffmpeg(file_path)
+        if result is not None:
+            return result
+        
         try:
+            from pydub import AudioSegment
+            
             # Load audio file
             audio = AudioSegment.from_file(file_path)
+        except Exception as e:
+            return f"Error extracting audio text: {str(e)}"
+        
+        return self._recognize_from_audiosegment(audio, file_path)
+    
+    def _load_whisper(self):
+        """Load the faster-whisper model once (thread-safe)"""
+        if self._stt is None:
+            with self._stt_lock:
+                if self._stt is None:
+                    import faster_whisper
+                    
+                    device, compute_type = _whisper_device()
+                    print(f"🔄 Loading Whisper model: {self.whisper_model} ({device}, {compute_type})")
+                    model = faster_whisper.WhisperModel(self.whisper_model, device=device, compute_type=compute_type,
+                                                        cpu_threads=self.whisper_threads,
+                                                        num_workers=WHISPER_WORKERS)
+                    # Batched pipeline (faster-whisper >= 1.1) decodes a file's VAD chunks together
+                    batched_pipeline = getattr(faster_whisper, 'BatchedInferencePipeline', None)
+                    self._stt_batched = batched_pipeline is not None
+                    self._stt = batched_pipeline(model=model) if self._stt_batched else model
+        return self._stt
+    
+    def _transcribe_whisper(self, file_path):
+        """
+        Transcribe an audio or video file with the local Whisper model
+        
+        Whisper decodes the file itself and chunks long audio with its VAD filter, so
+        no WAV export or segment splitting is needed.
+        """
+        try:
+            model = self._load_whisper()
+            if self._stt_batched:
+                segments, _ = model.transcribe(file_path, beam_size=1, batch_size=WHISPER_BATCH_SIZE)
+            else:
+                segments, _ = model.transcribe(file_path, beam_size=1, vad_filter=True)
+            text = " ".join(segment.text.strip() for segment in segments).strip()
+            if not text:
+                return "Speech recognition could not understand the audio. The file might be silent, contain only music/noise, or have unclear speech."
+            return text
+        except Exception as e:
+            return f"Error extracting audio text: {str(e)}"
+    
+    def _recognize_with_ffmpeg(self, file_path, audio_stream_only=False):
+        """
+        Recognize a short file by converting it to a 16kHz mono PCM WAV with ffmpeg
+        
+        Unlike pydub, this never holds the decoded PCM in Python, and the duration comes
+        from ffprobe without decoding.
+        
+        Args:
+            file_path: Audio or video file
+            audio_stream_only: Map only the first audio stream (for video containers)
+            
+        Returns:
+            Recognized text, or None if ffmpeg/ffprobe are unavailable, the file is too
+            long for a single request, or conversion fails (callers then fall back to pydub)
+        """
+        if shutil.which('ffmpeg') is None:
+            return None
+        duration_seconds = _probe_duration(file_path)
+        if duration_seconds is None or duration_seconds > LONG_AUDIO_SECONDS:
+            return None
+        
+        temp_wav = self._temp_path('.wav')
+        try:
+            _ffmpeg_to_stt_wav(file_path, temp_wav, audio_stream_only)
+            return self._recognize_from_wav_path(temp_wav)
+        except Exception:
+            return None
+        finally:
+            _discard(temp_wav)
+    
+    def _recognize_from_audiosegment(self, audio, file_path):
+        """
+        Run speech recognition on already-decoded audio
+        
+        Args:
+            audio: pydub AudioSegment
+            file_path: Path the audio was decoded from (used for long-audio messages)
             
+        Returns:
+            Recognized text or an error message
+        """
+        temp_wav = self._temp_path('.wav')
+        try:
             # Check if audio is too long (Google API has limits)
             duration_seconds = len(audio) / 1000
-            if duration_seconds > 300:  # 5 minutes limit
+            if duration_seconds > LONG_AUDIO_SECONDS:  # 5 minutes limit
                 print(f"⚠️  Audio is {duration_seconds:.1f} seconds long (exceeds 5-minute limit)")
                 print("🔄 Attempting to split and process in segments...")
                 return self.process_long_audio(file_path, audio)
             
-            # Create a temporary WAV file with optimized parameters for speech recognition
-            temp_wav = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-            temp_files.append(temp_wav.name)
-            
             # Export with speech recognition optimized parameters
-            audio.export(
-                temp_wav.name, 
-                format='wav',
-                parameters=[
-                    '-ar', '16000',      # Sample rate: 16kHz (optimal for speech)
-                    '-ac', '1',          # Mono channel (better for speech recognition)
-                    '-f', 'wav',         # Force WAV format
-                    '-acodec', 'pcm_s16le'  # PCM 16-bit little-endian
-                ]
-            )
-            
-            # Close the file to ensure it's written completely
-            temp_wav.close()
-            
-            # Initialize recognizer with optimized settings
-            recognizer = sr.Recognizer()
-            recognizer.energy_threshold = 300
-            recognizer.dynamic_energy_threshold = True
-            recognizer.pause_threshold = 0.8
+            audio.export(temp_wav, format='wav', parameters=STT_WAV_PARAMETERS)
             
-            with sr.AudioFile(temp_wav.name) as source:
-                # Read audio data
-                audio_data = recognizer.record(source)
-                
-                # Perform speech recognition with comprehensive error handling
-                try:
-                    text = recognizer.recognize_google(audio_data)
-                    return text
-                except sr.RequestError as e:
-                    if "Bad Request" in str(e):
-                        return "Speech recognition failed: Audio format may not be suitable for speech recognition. The file might be music, noise, or in an unsupported format."
-                    else:
-                        return f"Speech recognition service error: {str(e)}"
-                except sr.UnknownValueError:
-                    return "Speech recognition could not understand the audio. The file might be silent, contain only music/noise, or have unclear speech."
+            return self._recognize_from_wav_path(temp_wav)
                 
         except Exception as e:
-            # Try alternative approach with different audio parameters
+            # Try alternative approach with more basic export parameters, reusing the decoded audio
             try:
-                # Clean up first temp file
-                for temp_file in temp_files:
-                    if os.path.exists(temp_file):
-                        try:
-                            os.unlink(temp_file)
-                        except:
-                            pass
-                temp_files.clear()
+                audio.export(temp_wav, format='wav')
                 
-                # Try with more basic export parameters
-                audio = AudioSegment.from_file(file_path)
-                temp_wav2 = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-                temp_files.append(temp_wav2.name)
-                
-                # Export with basic parameters
-                audio.export(temp_wav2.name, format='wav')
-                temp_wav2.close()
-                
-                recognizer = sr.Recognizer()
-                with sr.AudioFile(temp_wav2.name) as source:
-                    audio_data = recognizer.record(source)
-                    try:
-                        text = recognizer.recognize_google(audio_data)
-                        return text
-                    except sr.RequestError as e:
-                        if "Bad Request" in str(e):
-                            return "Speech recognition failed: Audio format may not be suitable for speech recognition. The file might be music, noise, or in an unsupported format."
-                        else:
-                            return f"Speech recognition service error: {str(e)}"
-                    except sr.UnknownValueError:
-                        return "Speech recognition could not understand the audio. The file might be silent, contain only music/noise, or have unclear speech."
+                return self._recognize_from_wav_path(temp_wav, tuned=False)
                     
             except Exception as e2:
                 return f"Error extracting audio text: {str(e)} (Alternative method also failed: {str(e2)})"
                 
         finally:
-            # Clean up temporary files
-            for temp_file in temp_files:
-                if os.path.exists(temp_file):
-                    try:
-                        os.unlink(temp_file)
-                    except:
-                        pass
+            _discard(temp_wav)
+    
+    def _recognize_from_wav_path(self, wav_path, tuned=True):
+        """
+        Run Google speech recognition on a WAV file
+        
+        Args:
+            wav_path: Path to a WAV file
+            tuned: Use the recognizer settings tuned for speech (False for library defaults)
+            
+        Returns:
+            Recognized text, or a message starting with "Speech recognition" on failure
+        """
+        import speech_recognition as sr
+        
+        recognizer = _thread_recognizer(tuned)
+        
+        with sr.AudioFile(wav_path) as source:
+            # Read audio data
+            audio_data = recognizer.record(source)
+            
+            # Perform speech recognition with comprehensive error handling
+            try:
+                return recognizer.recognize_google(audio_data)
+            except sr.RequestError as e:
+                if "Bad Request" in str(e):
+                    return "Speech recognition failed: Audio format may not be suitable for speech recognition. The file might be music, noise, or in an unsupported format."
+                else:
+                    return f"Speech recognition service error: {str(e)}"
+            except sr.UnknownValueError:
+                return "Speech recognition could not understand the audio. The file might be silent, contain only music/noise, or have unclear speech."
     
     def process_long_audio(self, file_path, audio):
-        """Process long audio files by splitting into segments"""
+        """
+        Process long audio files by splitting into segments
+        
+        One producer thread exports segments to WAV while STT_SEGMENT_THREADS consumers send
+        already-exported segments to the speech service, so ffmpeg work overlaps the network
+        wait. The bounded queue caps how many exported segments sit on disk at once.
+        """
         try:
             print("🔄 Splitting audio into segments...")
             
-            # Split audio into 5-minute segments
-            segment_length = 300000  # 5 minutes in milliseconds
-            segments = []
+            # Split audio into short segments (more parallel requests, within the API's clip limit)
+            segment_starts = range(0, len(audio), LONG_AUDIO_SEGMENT_MS)
             
-            for i in range(0, len(audio), segment_length):
-                segment = audio[i:i + segment_length]
-                segments.append(segment)
+            print(f"✅ Created {len(segment_starts)} segments")
+            print(f"📝 Recognizing {len(segment_starts)} segments concurrently...")
             
-            print(f"✅ Created {len(segments)} segments")
+            segment_queue = queue.Queue(maxsize=STT_SEGMENT_QUEUE_SIZE)
+            segment_texts = [None] * len(segment_starts)
+            export_errors = []
             
-            # Process each segment
-            results = []
-            for i, segment in enumerate(segments, 1):
-                print(f"📝 Processing segment {i}/{len(segments)}...")
-                
-                # Create temporary file for segment
-                temp_segment = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-                segment.export(temp_segment.name, format='wav')
-                temp_segment.close()
-                
-                # Process segment
-                segment_text = self.extract_text_from_audio(temp_segment.name)
-                
-                # Clean up temp file
+            def produce():
                 try:
-                    os.unlink(temp_segment.name)
-                except:
-                    pass
-                
-                if not segment_text.startswith("Error") and not segment_text.startswith("Speech recognition"):
+                    for index, start in enumerate(segment_starts):
+                        temp_segment = self._temp_path('.wav')
+                        try:
+                            audio[start:start + LONG_AUDIO_SEGMENT_MS].export(
+                                temp_segment, format='wav', parameters=STT_WAV_PARAMETERS)
+                        except Exception:
+                            _discard(temp_segment)
+                            raise
+                        segment_queue.put((index, temp_segment))
+                except Exception as e:
+                    export_errors.append(e)
+                finally:
+                    # One sentinel per consumer ends the pipeline
+                    for _ in range(STT_SEGMENT_THREADS):
+                        segment_queue.put(None)
+            
+            def consume():
+                while True:
+                    item = segment_queue.get()
+                    if item is None:
+                        return
+                    index, temp_path = item
+                    try:
+                        segment_texts[index] = self._recognize_from_wav_path(temp_path)
+                    except Exception as e:
+                        segment_texts[index] = f"Error recognizing segment: {str(e)}"
+                    finally:
+                        _discard(temp_path)
+            
+            workers = [threading.Thread(target=produce, daemon=True)]
+            workers += [threading.Thread(target=consume, daemon=True) for _ in range(STT_SEGMENT_THREADS)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            
+            if export_errors:
+                raise export_errors[0]
+            
+            results = []
+            for i, segment_text in enumerate(segment_texts, 1):
+                if segment_text and not segment_text.startswith("Error") and not segment_text.startswith("Speech recognition"):
                     results.append(f"Segment {i}: {segment_text}")
                 else:
                     results.append(f"Segment {i}: [No speech detected]")
@@ -221,21 +402,66 @@ class FileTextExtractor:
             return f"Error reading text file: {str(e)}"
     
     def extract_text_from_pdf(self, file_path):
-        """Extract text from PDF files using pdfplumber"""
+        """Extract text from PDF files using PyMuPDF, falling back to pdfplumber"""
+        import pdfplumber
+        
+        if PYMUPDF_AVAILABLE:
+            try:
+                import fitz
+                
+                with fitz.open(file_path) as doc:
+                    page_count = doc.page_count
+                    if page_count < PDF_PARALLEL_MIN_PAGES or self.pdf_workers == 1:
+                        text = "\n".join(page.get_text("text") for page in doc)
+                        return text.strip()
+                return self._extract_pdf_pages_parallel(file_path, page_count, use_pymupdf=True)
+            except Exception:
+                pass
+        
         try:
             with pdfplumber.open(file_path) as doc:
-                text = ""
-                
-                for page in doc.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                
-                return text.strip()
+                page_count = len(doc.pages)
+                if page_count < PDF_PARALLEL_MIN_PAGES or self.pdf_workers == 1:
+                    text = ""
+                    
+                    for page in doc.pages:
+                        page_text = page.extract_text()
+                        _release_pdfplumber_page(page)
+                        if page_text:
+                            text += page_text + "\n"
+                    
+                    return text.strip()
+            
+            return self._extract_pdf_pages_parallel(file_path, page_count, use_pymupdf=False)
             
         except Exception as e:
             return f"Error extracting PDF text: {str(e)}"
     
+    def _extract_pdf_pages_parallel(self, file_path, page_count, use_pymupdf):
+        """
+        Extract text from a large PDF by splitting its pages into one contiguous range per worker
+        
+        Args:
+            file_path: Path to the PDF
+            page_count: Number of pages in the PDF
+            use_pymupdf: Use PyMuPDF in the workers (pdfplumber otherwise)
+            
+        Returns:
+            Text of all pages, in page order
+        """
+        workers = min(self.pdf_workers, page_count)
+        step = -(-page_count // workers)
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            parts = list(executor.map(_pdf_range_text,
+                                      [file_path] * len(ranges),
+                                      [start for start, _ in ranges],
+                                      [stop for _, stop in ranges],
+                                      [use_pymupdf] * len(ranges)))
+        
+        return "\n".join(part for part in parts if part).strip()
+    
     def extract_text_from_video(self, file_path):
         """Extract text from video files with enhanced audio extraction option"""
         try:
@@ -251,26 +477,58 @@ class FileTextExtractor:
             print(f"📊 File size: {file_size / (1024*1024):.1f} MB")
             print(f"🎥 Format: {file_ext}")
             
-            # First, try to extract audio from video (more reliable for spoken content)
-            print("🔊 Attempting audio extraction from video...")
-            audio_result = self.extract_audio_from_video(file_path)
-            
-            if audio_result and not audio_result.startswith("Error"):
-                print("✅ Audio extraction successful, processing with speech recognition...")
-                return audio_result
+            # Run speech recognition and frame OCR side by side and return the first one that
+            # finds text, so a silent captioned video doesn't wait for speech recognition to
+            # fail and a transcribed video doesn't wait for OCR of every sampled frame
+            print("🔊 Attempting audio extraction and frame OCR in parallel...")
+            stop_ocr = threading.Event()
+            executor = ThreadPoolExecutor(max_workers=2)
+            try:
+                futures = {
+                    executor.submit(self.extract_audio_from_video, file_path): "audio",
+                    executor.submit(self.extract_text_from_video_frames, file_path, stop_ocr): "ocr",
+                }
+                results = {}
+                for future in as_completed(futures):
+                    method = futures[future]
+                    try:
+                        results[method] = future.result()
+                    except Exception as e:
+                        results[method] = f"Error extracting video text: {str(e)}"
+                    
+                    if _has_extracted_text(results[method]):
+                        if method == "audio":
+                            print("✅ Audio extraction successful, processing with speech recognition...")
+                        else:
+                            print("✅ Text found in video frames")
+                        return results[method]
+            finally:
+                # Don't wait for the slower method; a still-running OCR job stops at its next frame
+                stop_ocr.set()
+                executor.shutdown(wait=False)
             
-            # If audio extraction fails, fall back to OCR method
-            print("🔄 Audio extraction failed, falling back to OCR method...")
-            return self.extract_text_from_video_frames(file_path)
+            print("🔄 Audio extraction failed and no text found in video frames")
+            return results["ocr"]
                 
         except Exception as e:
             return f"Error extracting video text: {str(e)}"
     
     def extract_audio_from_video(self, file_path):
         """Extract audio from video files and process with speech recognition"""
+        if self.stt_backend == "whisper":
+            result = self._transcribe_whisper(file_path)
+            return result.replace("Error extracting audio text", "Error extracting audio from video", 1)
+        
+        # Short videos: let ffmpeg pull the audio track straight into a recognizer-ready WAV
+        result = self._recognize_with_ffmpeg(file_path, audio_stream_only=True)
+        if result is not None:
+            return result
+        
         try:
-            # Extract audio using pydub
-            video = AudioSegment.from_file(file_path)
+            from pydub import AudioSegment
+            
+            # Decode only the first audio stream; the video streams are never demuxed
+            video = AudioSegment.from_file(file_path, parameters=['-map', '0:a:0'])
             
             # Get audio properties
             duration_seconds = len(video) / 1000
@@ -281,34 +539,22 @@ class FileTextExtractor:
             print(f"🔊 Audio channels: {channels}")
             print(f"🔊 Sample rate: {sample_rate} Hz")
             
-            # Check if audio is too long
-            if duration_seconds > 300:  # 5 minutes limit
-                print("⚠️  Audio is too long, splitting into segments...")
-                return self.process_long_audio(file_path, video)
-            
-            # Create temporary WAV file
-            temp_wav = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-            temp_wav.close()
-            
-            # Export audio with optimized parameters
-            video.export(temp_wav.name, format='wav')
-            
-            # Process with speech recognition
-            result = self.extract_text_from_audio(temp_wav.name)
-            
-            # Clean up
-            try:
-                os.unlink(temp_wav.name)
-            except:
-                pass
-            
-            return result
+            # Recognize straight from the decoded audio (exported once as 16kHz mono PCM)
+            return self._recognize_from_audiosegment(video, file_path)
             
         except Exception as e:
             return f"Error extracting audio from video: {str(e)}"
     
-    def extract_text_from_video_frames(self, file_path):
-        """Extract text from video files using OCR on frames (fallback method)"""
+    def extract_text_from_video_frames(self, file_path, stop_event=None):
+        """
+        Extract text from video files using OCR on frames (fallback method)
+        
+        Args:
+            file_path: Path to the video file
+            stop_event: Optional threading.Event; once set, OCR stops before the next frame
+        """
+        import cv2
+        
         try:
             # Try to open video file with OpenCV
             cap = cv2.VideoCapture(file_path)
@@ -328,46 +574,64 @@ class FileTextExtractor:
                 return "Error: Video file appears to be empty or corrupted"
             
             text_frames = []
-            frame_count = 0
+            sampled_count = 0
             sample_rate = max(1, total_frames // 100)  # Process ~100 frames total
+            sample_indices = range(0, total_frames, sample_rate)
+            progress_step = max(1, len(sample_indices) // 10)
             
             print(f"🔄 Processing every {sample_rate}th frame...")
             
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
+            # One Tesseract instance for all frames instead of a tesseract process per frame
+            tess_api = _open_tess_api()
+            try:
+                last_hash = None
+                duplicate_count = 0
+                no_text_count = 0
+                mser = cv2.MSER_create()
                 
-                # Process every nth frame
-                if frame_count % sample_rate == 0:
+                for frame_index, frame in self._iter_sampled_frames(cap, sample_indices):
+                    if stop_event is not None and stop_event.is_set():
+                        break
                     try:
-                        # Convert frame to PIL Image
-                        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        pil_image = Image.fromarray(frame_rgb)
+                        # Binarize the frame so Tesseract works on a small single-channel image
+                        binary = _preprocess_frame_for_ocr(frame)
+                        
+                        # Skip frames that look like the last OCR'd one (e.g. a caption still on screen)
+                        frame_hash = _perceptual_hash(binary)
+                        if last_hash is not None and bin(frame_hash ^ last_hash).count("1") < FRAME_HASH_MAX_DISTANCE:
+                            duplicate_count += 1
+                            continue
+                        last_hash = frame_hash
+                        
+                        # Cheap text detection first: frames without text-like regions skip OCR
+                        if not _has_text_regions(mser, binary):
+                            no_text_count += 1
+                            continue
                         
                         # Extract text using OCR
-                        frame_text = pytesseract.image_to_string(pil_image)
+                        frame_text = _ocr_image(tess_api, binary)
                         if frame_text.strip():
                             # Clean up the text
                             cleaned_text = ' '.join(frame_text.strip().split())
                             if len(cleaned_text) > 10:  # Only keep meaningful text
-                                text_frames.append(f"Frame {frame_count}: {cleaned_text}")
+                                text_frames.append(f"Frame {frame_index}: {cleaned_text}")
                     except Exception as e:
-                        print(f"⚠️  Warning: Error processing frame {frame_count}: {e}")
-                        continue
-                
-                frame_count += 1
-                
-                # Progress indicator
-                if frame_count % (total_frames // 10) == 0:
-                    progress = (frame_count / total_frames) * 100
-                    print(f"📊 Progress: {progress:.1f}% ({frame_count}/{total_frames} frames)")
-            
-            cap.release()
+                        print(f"⚠️  Warning: Error processing frame {frame_index}: {e}")
+                    finally:
+                        sampled_count += 1
+                    
+                    # Progress indicator
+                    if sampled_count % progress_step == 0:
+                        progress = min(100.0, ((frame_index + 1) / total_frames) * 100)
+                        print(f"📊 Progress: {progress:.1f}% ({frame_index + 1}/{total_frames} frames)")
+            finally:
+                cap.release()
+                if tess_api is not None:
+                    tess_api.End()
             
             if text_frames:
                 result = f"Video text extraction completed successfully.\n"
-                result += f"Processed {frame_count} frames, found text in {len(text_frames)} frames.\n\n"
+                result += f"Processed {sampled_count} of {total_frames} frames ({duplicate_count} skipped as near-duplicates, {no_text_count} with no text regions), found text in {len(text_frames)} frames.\n\n"
                 result += "Extracted text:\n" + "\n".join(text_frames)
                 return result
             else:
@@ -376,13 +640,57 @@ class FileTextExtractor:
         except Exception as e:
             return f"Error extracting video text from frames: {str(e)}"
     
-    def process_file(self, file_path):
-        """Process a single file and extract text"""
+    def _iter_sampled_frames(self, cap, sample_indices):
+        """
+        Yield (frame_index, frame) for the sampled frames only
+        
+        Widely spaced samples are reached by seeking; close ones (or codecs where seeking
+        fails) by grab(), which skips the decode-to-BGR and copy for unsampled frames.
+        
+        Args:
+            cap: Opened cv2.VideoCapture positioned at frame 0
+            sample_indices: Increasing frame indices to return
+        """
+        import cv2
+        
+        use_seek = len(sample_indices) > 1 and sample_indices[1] - sample_indices[0] >= FRAME_SEEK_MIN_STEP
+        position = 0  # index of the next frame cap.read()/grab() will return
+        
+        for frame_index in sample_indices:
+            if use_seek and frame_index != position:
+                if cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index) and int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_index:
+                    position = frame_index
+                else:
+                    # Seek unsupported or inaccurate for this codec: rewind and walk with grab()
+                    use_seek = False
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    position = 0
+            
+            while position < frame_index:
+                if not cap.grab():
+                    return
+                position += 1
+            
+            ret, frame = cap.read()
+            if not ret:
+                return
+            position += 1
+            yield frame_index, frame
+    
+    def process_file(self, file_path, file_type=None):
+        """
+        Process a single file and extract text
+        
+        Args:
+            file_path: Path to the file
+            file_type: Already-detected file type (detected from the path if None)
+        """
         if not os.path.exists(file_path):
             return None, None, "File not found"
         
         file_name = os.path.basename(file_path)
-        file_type = self.detect_file_type(file_path)
+        if file_type is None:
+            file_type = self.detect_file_type(file_path)
         
         if file_type == 'unknown':
             return file_name, file_type, "Unsupported file type"
@@ -403,8 +711,19 @@ class FileTextExtractor:
         
         return file_name, file_type, extracted_text
     
-    def process_folder(self, folder_path):
-        """Process all supported files in a folder"""
+    def process_folder(self, folder_path, max_workers=None):
+        """
+        Process all supported files in a folder
+        
+        Files are independent, so they are extracted concurrently: text files are read
+        up front in one batch, audio files, whose cost is mostly waiting on the Google
+        speech API, run on a thread pool, and the CPU-heavy PDF/video files on a
+        process pool.
+        
+        Args:
+            folder_path: Folder containing the files
+            max_workers: Process pool size (defaults to the CPU count)
+        """
         if not os.path.exists(folder_path):
             print(f"❌ Error: Folder '{folder_path}' does not exist")
             return
@@ -427,22 +746,22 @@ class FileTextExtractor:
         print(f"📁 Found {len(supported_files)} supported files to process")
         print("=" * 60)
         
-        # Process each supported file
-        for i, (filename, file_path, file_type) in enumerate(supported_files, 1):
+        # Read all text files at once; they need no extraction beyond the read itself
+        text_contents = self._batch_read_text_files(
+            [file_path for _, file_path, file_type in supported_files if file_type == 'text'])
+        
+        completed = {}
+        
+        def report(i, filename, file_type, result):
             print(f"\n📄 File {i}/{len(supported_files)}: {filename}")
             print(f"🎯 Type: {file_type.upper()}")
             print("-" * 40)
             
-            file_name, file_type, extracted_text = self.process_file(file_path)
-            
-            if file_name:
-                results.append({
-                    'filename': file_name,
-                    'type': file_type,
-                    'text': extracted_text
-                })
+            if result['filename']:
+                completed[i] = result
                 
                 # Show preview of extracted text
+                extracted_text = result['text']
                 if extracted_text and not extracted_text.startswith("Error"):
                     preview = extracted_text[:200] + "..." if len(extracted_text) > 200 else extracted_text
                     print(f"✅ Extracted: {preview}")
@@ -451,8 +770,61 @@ class FileTextExtractor:
             
             print("=" * 60)
         
+        # Process supported files concurrently; results keep the folder listing order
+        with ThreadPoolExecutor(max_workers=STT_THREADS) as thread_pool, \
+             ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                                 initializer=_init_folder_worker,
+                                 initargs=(self.stt_backend, self.whisper_model)) as process_pool:
+            futures = {}
+            for i, (filename, file_path, file_type) in enumerate(supported_files, 1):
+                if file_type == 'text':
+                    report(i, filename, file_type,
+                           {'filename': filename, 'type': file_type, 'text': text_contents[file_path]})
+                    continue
+                if file_type == 'audio':
+                    future = thread_pool.submit(self._process_one, file_path, file_type)
+                else:
+                    future = process_pool.submit(_process_one, file_path, file_type)
+                futures[future] = (i, filename, file_type)
+            
+            for future in as_completed(futures):
+                i, filename, file_type = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'filename': filename, 'type': file_type, 'text': f"Error processing file: {str(e)}"}
+                report(i, filename, file_type, result)
+        
+        results.extend(completed[i] for i in sorted(completed))
         return results
     
+    def _batch_read_text_files(self, paths):
+        """
+        Read many text files concurrently
+        
+        Blocking reads release the GIL, so a thread pool keeps many reads in flight,
+        which matters most on network filesystems and spinning disks.
+        
+        Args:
+            paths: Text file paths
+            
+        Returns:
+            Dict mapping each path to its text (or error message)
+        """
+        if not paths:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(TEXT_READ_THREADS, len(paths))) as executor:
+            return dict(zip(paths, executor.map(self.extract_text_from_text_file, paths)))
+    
+    def _process_one(self, file_path, file_type=None):
+        """Process one file and return its result as a plain dict"""
+        file_name, file_type, extracted_text = self.process_file(file_path, file_type)
+        return {
+            'filename': file_name,
+            'type': file_type,
+            'text': extracted_text
+        }
+    
     def display_results(self, results):
         """Display extraction results in a formatted way"""
         if not results:
@@ -478,6 +850,227 @@ class FileTextExtractor:
             print("=" * 80)
             print()
 
+# Threads for audio files, which mostly wait on the speech recognition service
+STT_THREADS = 16
+
+# Minimum gap (frames) between OCR samples for seeking to beat grabbing through the video
+FRAME_SEEK_MIN_STEP = 30
+
+# Frames taller than this are downscaled before OCR; Tesseract page segmentation mode 6
+# (a single uniform block of text) suits captions and slides
+OCR_MAX_FRAME_HEIGHT = 1080
+OCR_TESSERACT_CONFIG = '--psm 6'
+
+# Frames are scaled to this width for MSER text detection, and need at least this many
+# character-like regions to be sent to OCR
+OCR_DETECT_WIDTH = 640
+OCR_MIN_TEXT_REGIONS = 10
+
+# Sampled frames whose pHash differs from the last OCR'd frame by fewer bits are skipped
+FRAME_HASH_MAX_DISTANCE = 5
+
+# PDFs with at least this many pages are extracted in parallel page ranges
+PDF_PARALLEL_MIN_PAGES = 64
+
+# Audio longer than this (seconds) is split into segments before recognition
+LONG_AUDIO_SECONDS = 300
+
+# Threads reading text files in process_folder
+TEXT_READ_THREADS = 32
+
+# Length of the segments long audio is split into, and threads recognizing them
+LONG_AUDIO_SEGMENT_MS = 60000
+STT_SEGMENT_THREADS = 8
+
+# Exported segments waiting for a recognizer thread (bounds temp-disk use)
+STT_SEGMENT_QUEUE_SIZE = 2
+
+# ffmpeg export parameters for speech recognition: 16kHz mono PCM 16-bit WAV
+STT_WAV_PARAMETERS = ['-ar', '16000', '-ac', '1', '-f', 'wav', '-acodec', 'pcm_s16le']
+
+def _whisper_device():
+    """Pick the Whisper device and compute type: int8 weights with fp16 compute on CUDA, int8 on CPU"""
+    import ctranslate2
+    
+    if ctranslate2.get_cuda_device_count() > 0:
+        return "cuda", "int8_float16"
+    return "cpu", "int8"
+
+def _probe_duration(path):
+    """Return the container duration in seconds from ffprobe (no decoding), or None"""
+    if shutil.which('ffprobe') is None:
+        return None
+    try:
+        completed = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', path],
+            check=True, capture_output=True, text=True
+        )
+        return float(completed.stdout.strip())
+    except (subprocess.CalledProcessError, OSError, ValueError):
+        return None
+
+def _ffmpeg_to_stt_wav(in_path, out_path, audio_stream_only=False):
+    """Convert a media file to a 16kHz mono PCM 16-bit WAV with one ffmpeg run"""
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-i', in_path]
+    if audio_stream_only:
+        command += ['-map', '0:a:0']
+    command += ['-vn'] + STT_WAV_PARAMETERS + [out_path]
+    subprocess.run(command, check=True, capture_output=True, text=True)
+
+def _has_extracted_text(result):
+    """True if an extraction result is text rather than an error or no-text message"""
+    return bool(result) and not result.startswith(("Error", "No text", "No speech", "Speech recognition"))
+
+def _discard(path):
+    """Remove a scratch file, ignoring files that were never created"""
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def _is_stt_ready_wav(path):
+    """
+    Check whether a file is a WAV the recognizer can take directly
+    
+    True for 16kHz mono 16-bit PCM WAVs no longer than LONG_AUDIO_SECONDS.
+    """
+    if not path.lower().endswith('.wav'):
+        return False
+    try:
+        with wave.open(path, 'rb') as wav_file:
+            return (wav_file.getframerate() == 16000
+                    and wav_file.getnchannels() == 1
+                    and wav_file.getsampwidth() == 2
+                    and wav_file.getnframes() / 16000 <= LONG_AUDIO_SECONDS)
+    except (wave.Error, EOFError, OSError):
+        return False
+
+# One speech recognizer per thread and settings profile, reused across requests
+_RECOGNIZERS = threading.local()
+
+def _thread_recognizer(tuned=True):
+    """Return this thread's recognizer (tuned for speech, or with library defaults)"""
+    import speech_recognition as sr
+    
+    attribute = 'tuned' if tuned else 'default'
+    recognizer = getattr(_RECOGNIZERS, attribute, None)
+    if recognizer is None:
+        recognizer = sr.Recognizer()
+        if tuned:
+            recognizer.energy_threshold = 300
+            recognizer.dynamic_energy_threshold = True
+            recognizer.pause_threshold = 0.8
+        setattr(_RECOGNIZERS, attribute, recognizer)
+    return recognizer
+
+# Per-process extractor for process_folder workers, created by _init_folder_worker
+_FOLDER_EXTRACTOR = None
+
+def _init_folder_worker(stt_backend="google", whisper_model=WHISPER_MODEL_SIZE):
+    """Process pool initializer: build one FileTextExtractor per worker"""
+    global _FOLDER_EXTRACTOR
+    # Every worker loads its own Whisper model, so cap its threads to avoid oversubscription;
+    # the pool already spreads files over the CPUs, so PDFs are not split into a nested pool
+    _FOLDER_EXTRACTOR = FileTextExtractor(stt_backend=stt_backend, whisper_model=whisper_model,
+                                          whisper_threads=WHISPER_POOL_WORKER_THREADS, pdf_workers=1)
+
+def _process_one(file_path, file_type=None):
+    """Process one file in a worker process (module-level so it can be pickled)"""
+    extractor = _FOLDER_EXTRACTOR if _FOLDER_EXTRACTOR is not None else FileTextExtractor(pdf_workers=1)
+    return extractor._process_one(file_path, file_type)
+
+def _preprocess_frame_for_ocr(frame):
+    """Downscale, grayscale, denoise and Otsu-binarize a BGR video frame for OCR"""
+    import cv2
+    
+    height, width = frame.shape[:2]
+    if height > OCR_MAX_FRAME_HEIGHT:
+        scale = OCR_MAX_FRAME_HEIGHT / height
+        frame = cv2.resize(frame, (int(width * scale), OCR_MAX_FRAME_HEIGHT), interpolation=cv2.INTER_AREA)
+    
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    gray = cv2.medianBlur(gray, 3)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+def _perceptual_hash(image):
+    """64-bit DCT perceptual hash (pHash) of a single-channel image, as an int"""
+    import cv2
+    import numpy as np
+    
+    small = cv2.resize(image, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low_freq = cv2.dct(small)[:8, :8].flatten()
+    bits = low_freq > np.median(low_freq)
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def _has_text_regions(mser, binary):
+    """Detect whether a binarized frame has enough character-sized MSER regions to be worth OCR"""
+    import cv2
+    
+    height, width = binary.shape
+    if width > OCR_DETECT_WIDTH:
+        scale = OCR_DETECT_WIDTH / width
+        binary = cv2.resize(binary, (OCR_DETECT_WIDTH, int(height * scale)), interpolation=cv2.INTER_AREA)
+        height, width = binary.shape
+    
+    _, boxes = mser.detectRegions(binary)
+    # Characters are small and not extremely elongated; large blobs are backgrounds/shapes
+    text_like = [
+        (w, h) for _, _, w, h in boxes
+        if 4 <= h <= height // 4 and 0.1 <= w / h <= 5
+    ]
+    return len(text_like) >= OCR_MIN_TEXT_REGIONS
+
+def _open_tess_api():
+    """Start a reusable tesserocr API, or return None to fall back to pytesseract"""
+    if not TESSEROCR_AVAILABLE:
+        return None
+    try:
+        from tesserocr import PyTessBaseAPI, PSM
+        
+        return PyTessBaseAPI(psm=PSM.SINGLE_BLOCK)
+    except Exception as e:
+        print(f"⚠️  Warning: tesserocr unavailable ({e}), using pytesseract")
+        return None
+
+def _ocr_image(tess_api, image):
+    """OCR a single-channel uint8 image with the shared tesserocr API if available, else pytesseract"""
+    import numpy as np
+    import pytesseract
+    
+    if tess_api is None:
+        return pytesseract.image_to_string(image, config=OCR_TESSERACT_CONFIG)
+    # Hand tesserocr the raw pixel buffer: no PIL image, no encode
+    image = np.ascontiguousarray(image)
+    height, width = image.shape
+    tess_api.SetImageBytes(image.tobytes(), width, height, 1, width)
+    return tess_api.GetUTF8Text()
+
+def _release_pdfplumber_page(page):
+    """Drop a pdfplumber page's cached layout objects so only one page is held at a time"""
+    # Page.close() (pdfplumber >= 0.11) flushes the object cache and the text map cache
+    release = getattr(page, 'close', None) or page.flush_cache
+    release()
+
+def _pdf_range_text(file_path, start, stop, use_pymupdf):
+    """Extract text from pages [start, stop) of a PDF in a worker process"""
+    import pdfplumber
+    
+    if use_pymupdf:
+        import fitz
+        
+        with fitz.open(file_path) as doc:
+            return "\n".join(doc[i].get_text("text") for i in range(start, stop))
+    
+    # pdfplumber page numbers are 1-based; only the requested pages are parsed
+    with pdfplumber.open(file_path, pages=list(range(start + 1, stop + 1))) as doc:
+        page_texts = []
+        for page in doc.pages:
+            page_texts.append(page.extract_text())
+            _release_pdfplumber_page(page)
+    return "\n".join(text for text in page_texts if text)
+
 def main():
     """Main function to run the text extractor"""
     print("🚀 File Text Extractor - Enhanced Version")
@@ -15,6 +15,9 @@ import pickle
 import json
 from dataclasses import dataclass
 import os
+import sqlite3
+import sys
+import threading
 
 try:
     import faiss
@@ -22,7 +25,56 @@ try:
 except ImportError:
     FAISS_AVAILABLE = False
 
-@dataclass
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def _check_faiss_simd() -> Optional[str]:
+    """
+    Check whether the loaded FAISS build uses AVX-512 on a CPU that supports it
+    
+    Returns:
+        A warning message if the CPU has AVX-512 but FAISS was built without it, else None
+    """
+    try:
+        compile_options = faiss.get_compile_options().upper()
+    except AttributeError:
+        return None
+    if 'AVX512' in compile_options:
+        return None
+    
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            cpu_flags = f.read()
+    except OSError:
+        return None  # not Linux; nothing to compare against
+    if ' avx512f' not in cpu_flags:
+        return None
+    
+    return (f"This CPU supports AVX-512 but FAISS was loaded with '{compile_options.strip()}' "
+            "SIMD kernels; vector search is slower than it could be. Install a faiss-cpu build "
+            "with AVX-512 support (e.g. conda install -c pytorch faiss-cpu) or build FAISS with "
+            "-DFAISS_OPT_LEVEL=avx512 and -mprefer-vector-width=512")
+
+# Warn about a non-AVX-512 FAISS build once per process, not once per LocalVectorDB
+_FAISS_SIMD_CHECKED = False
+
+def _dump_json(obj) -> bytes:
+    """Serialize metadata to JSON bytes (orjson when installed; unknown types become strings)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=str).encode('utf-8')
+
+def _load_json(data: bytes):
+    """Parse JSON bytes written by _dump_json"""
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+# Attribute storage in __slots__ instead of a per-instance __dict__ (dataclass slots need Python 3.10+)
+DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class SearchResult:
     """Represents a search result from local vector database"""
     chunk_id: str
@@ -34,12 +86,52 @@ class SearchResult:
 class LocalVectorDB:
     """Local vector database using FAISS for similarity search"""
     
-    def __init__(self, index_path: str = "local_vector_index"):
+    # Supported vector quantization modes for the local index
+    QUANTIZE_MODES = ('none', 'bf16', 'fp16', 'int8', 'binary')
+    
+    # Supported index layouts: exhaustive flat scan, inverted file with product quantization,
+    # or an HNSW proximity graph
+    INDEX_TYPES = ('flat', 'ivfpq', 'hnsw')
+    
+    # An ivfpq index is trained once this many vectors are stored; smaller corpora are
+    # searched exactly over the stored float32 vectors
+    IVFPQ_TRAIN_SIZE = 10000
+    
+    # An int8 scalar quantizer is trained once this many vectors have been buffered (or
+    # when the index is first saved); until then the buffered vectors are searched exactly
+    INT8_TRAIN_SIZE = 10000
+    
+    # Approximate ivfpq candidates re-scored exactly against the stored vectors
+    RERANK_CANDIDATES = 50
+    
+    # Devices an index can be searched on ('gpu' needs a faiss-gpu build)
+    DEVICES = ('cpu', 'gpu')
+    
+    def __init__(self, index_path: str = "local_vector_index", quantize: str = "none",
+                 index_type: str = "flat", nlist: int = 1024, pq_m: int = 16, pq_nbits: int = 8,
+                 hnsw_m: int = 32, ef_construction: int = 100, ef_search: int = 64,
+                 rerank: bool = False, read_only: bool = False, device: str = "cpu"):
         """
         Initialize local vector database
         
         Args:
             index_path: Path to store the FAISS index and metadata
+            quantize: Vector storage format ('none' for float32, 'bf16', 'fp16', 'int8', or 'binary')
+            index_type: Index layout ('flat', 'ivfpq' or 'hnsw')
+            nlist: Maximum number of IVF clusters; about sqrt(N) are used (ivfpq only)
+            pq_m: Number of product quantizer sub-vectors (ivfpq only)
+            pq_nbits: Bits per sub-vector code (ivfpq only)
+            hnsw_m: Graph neighbors per node (hnsw only)
+            ef_construction: Candidate list size while building the graph (hnsw only)
+            ef_search: Default candidate list size while searching (hnsw only)
+            rerank: Keep the float32 vectors on disk after training and re-score approximate
+                results exactly with them (ivfpq only; otherwise they are dropped once trained)
+            read_only: Open the saved index for searching only (create, upsert and delete are
+                refused). FAISS can only memory-map IVF inverted lists, so this saves RAM for
+                ivfpq indexes, whose codes stay on disk until searches touch them; flat,
+                scalar-quantized, hnsw and binary indexes are still read fully into RAM
+            device: 'cpu', or 'gpu' to search flat and ivfpq indexes on GPU 0 (hnsw and
+                quantized flat indexes stay on the CPU)
         """
         self.logger = logging.getLogger(__name__)
         self.index_path = Path(index_path)
@@ -48,37 +140,140 @@ class LocalVectorDB:
         if not FAISS_AVAILABLE:
             raise ImportError("faiss-cpu package is required. Install with: pip install faiss-cpu")
         
+        global _FAISS_SIMD_CHECKED
+        if not _FAISS_SIMD_CHECKED:
+            _FAISS_SIMD_CHECKED = True
+            simd_warning = _check_faiss_simd()
+            if simd_warning:
+                self.logger.warning(simd_warning)
+        
+        # FAISS parallelizes batched flat and IVF searches over queries with OpenMP; HNSW
+        # gains less since each query's graph walk is serial. FAISS_THREADS overrides the count
+        faiss.omp_set_num_threads(int(os.environ.get('FAISS_THREADS', os.cpu_count() or 1)))
+        
         self.index = None
         self.metadata = {}
+        # Chunk id of each vector, by its position in the index
+        self._id_list = np.array([], dtype=object)
         self.dimension = None
         self.is_trained = False
+        self.quantize = quantize
+        self.index_type = index_type
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.rerank = rerank
+        self.read_only = read_only
+        
+        # GPU search: shared FAISS GPU resources, and whether self.index currently lives on the GPU
+        self._gpu_resources = None
+        self._index_on_gpu = False
+        self.device = self._select_device(device)
+        
+        # Full-precision copy of the vectors (ivfpq only): training data, exact search for
+        # small corpora, and re-ranking; memory-mapped from disk once saved. Vectors upserted
+        # since the last save wait in the in-memory tail and are written once by _save_index
+        self.raw_vectors = None
+        self._raw_tail = []
+        
+        # Vectors held back from an untrained int8 index until there is a training sample
+        self._untrained_vectors = []
+        
+        # SQLite FTS5 full-text index over chunk content, for keyword search
+        self._keyword_db = None
+        self._keyword_lock = threading.Lock()
         
         # Try to load existing index
         self._load_index()
+        self._build_keyword_index()
         
         self.logger.info("Local vector database initialized")
     
     def create_index(self, index_name: str = None, dimension: int = None, **kwargs) -> bool:
         """
-        Create a new FAISS index
+        Create a new, empty FAISS index, discarding the chunks of any previous one
         
         Args:
             index_name: Index name (ignored for local DB)
             dimension: Embedding dimension
-            **kwargs: Additional parameters (ignored for local DB)
+            **kwargs: Additional parameters; 'quantize' selects the vector storage
+                format ('none', 'bf16', 'fp16', 'int8', 'binary'), 'index_type' the index layout
+                ('flat', 'ivfpq', 'hnsw') and 'device' where it is searched ('cpu', 'gpu'),
+                other keys are ignored
             
         Returns:
             True if successful
         """
+        if self._refuse_write("create index"):
+            return False
+        
         try:
+            quantize = kwargs.get('quantize', self.quantize)
+            if quantize not in self.QUANTIZE_MODES:
+                raise ValueError(f"Unsupported quantize mode: {quantize}. Supported: {', '.join(self.QUANTIZE_MODES)}")
+            
+            index_type = kwargs.get('index_type', self.index_type)
+            if index_type not in self.INDEX_TYPES:
+                raise ValueError(f"Unsupported index type: {index_type}. Supported: {', '.join(self.INDEX_TYPES)}")
+            
+            self.device = self._select_device(kwargs.get('device', self.device))
             self.dimension = dimension
+            self.quantize = quantize
+            self.index_type = index_type
+            self.raw_vectors = None
+            self._raw_tail = []
+            self._untrained_vectors = []
+            
+            # A new index starts empty: forget the chunks stored in the previous one
+            self.metadata = {}
+            self._id_list = np.array([], dtype=object)
+            self._clear_keyword_index()
             
             # Create FAISS index (IndexFlatIP for inner product, IndexFlatL2 for L2 distance)
             # Using IndexFlatIP with normalized vectors gives cosine similarity
-            self.index = faiss.IndexFlatIP(dimension)
+            if self.index_type in ('ivfpq', 'hnsw') and quantize != 'none':
+                self.logger.warning(f"quantize={quantize} is ignored for the {self.index_type} index")
+                self.quantize = 'none'
+            
+            if self.index_type == 'ivfpq':
+                # Built once IVFPQ_TRAIN_SIZE vectors are stored to train the clustering on
+                self.index = None
+            elif self.index_type == 'hnsw':
+                # Graph search visits O(log N) vectors per query instead of scanning all of them
+                self.index = faiss.IndexHNSWFlat(dimension, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+                self.index.hnsw.efConstruction = self.ef_construction
+                self.index.hnsw.efSearch = self.ef_search
+            elif quantize in ('bf16', 'fp16'):
+                # 16-bit scalar quantizer: half the bytes read per vector scanned, no training.
+                # bf16 keeps float32's range (and uses AVX512_BF16 dot products where available)
+                qtype = getattr(faiss.ScalarQuantizer, 'QT_bf16', None) if quantize == 'bf16' else None
+                if qtype is None:
+                    if quantize == 'bf16':
+                        self.logger.warning("This FAISS version has no bf16 scalar quantizer; using fp16")
+                        self.quantize = 'fp16'
+                    qtype = faiss.ScalarQuantizer.QT_fp16
+                self.index = faiss.IndexScalarQuantizer(dimension, qtype, faiss.METRIC_INNER_PRODUCT)
+            elif quantize == 'int8':
+                # 8-bit scalar quantizer: 4x smaller than float32, trained on INT8_TRAIN_SIZE vectors
+                self.index = faiss.IndexScalarQuantizer(
+                    dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+                )
+            elif quantize == 'binary':
+                # Sign bits packed 8 per byte, compared by Hamming distance
+                if dimension % 8 != 0:
+                    raise ValueError(f"Binary quantization needs a dimension that is a multiple of 8, "
+                                     f"got {dimension}")
+                self.index = faiss.IndexBinaryFlat(dimension)
+            else:
+                self.index = faiss.IndexFlatIP(dimension)
+            self.index = self._to_device(self.index)
             self.is_trained = True
             
-            self.logger.info(f"Created local FAISS index with dimension {dimension}")
+            self.logger.info(f"Created local FAISS index with dimension {dimension} "
+                             f"(type: {self.index_type}, quantize: {self.quantize}, device: {self.device})")
             return True
             
         except Exception as e:
@@ -95,19 +290,32 @@ class LocalVectorDB:
         Returns:
             True if successful
         """
+        if self._refuse_write("delete index"):
+            return False
+        
         try:
             # Remove index files
-            index_file = self.index_path / "faiss_index.bin"
-            metadata_file = self.index_path / "metadata.pkl"
-            
-            if index_file.exists():
-                index_file.unlink()
-            if metadata_file.exists():
-                metadata_file.unlink()
+            self._close_keyword_index()
+            for file_name in ("faiss_index.bin", "faiss_index_binary.bin",
+                              "metadata.json", "metadata.pkl", "raw_vectors.npy", "keywords.db"):
+                index_file = self.index_path / file_name
+                if index_file.exists():
+                    index_file.unlink()
             
             self.index = None
+            self._index_on_gpu = False
             self.metadata = {}
+            self._id_list = np.array([], dtype=object)
+            self.raw_vectors = None
+            self._raw_tail = []
+            self._untrained_vectors = []
             self.is_trained = False
+            self._build_keyword_index()
+            
+            # Start over with an empty index of the same layout, so the next upsert
+            # goes straight to adding vectors
+            if self.dimension is not None:
+                self.create_index(dimension=self.dimension)
             
             self.logger.info("Local index deleted")
             return True
@@ -116,28 +324,55 @@ class LocalVectorDB:
             self.logger.error(f"Failed to delete local index: {str(e)}")
             return False
     
-    def upsert_embeddings(self, embeddings: List, index_name: str = None) -> bool:
+    def upsert_embeddings(self, embeddings: List, index_name: str = None, persist: bool = True) -> bool:
         """
         Insert or update embeddings in the local index
         
         Args:
             embeddings: List of EmbeddingResult objects
             index_name: Index name (ignored for local DB)
+            persist: Save the index to disk after this upsert; pass False when streaming
+                many batches and call flush() once at the end
             
         Returns:
             True if successful
         """
+        if self._refuse_write("upsert embeddings"):
+            return False
+        
         try:
-            if not self.is_trained:
+            # An empty index left by delete_index is rebuilt if the embedding size changed
+            resized = bool(embeddings) and not self.metadata and self.dimension != embeddings[0].embedding_dim
+            if not self.is_trained or resized:
                 if not embeddings:
                     return False
-                self.create_index(dimension=embeddings[0].embedding_dim)
+                if not self.create_index(dimension=embeddings[0].embedding_dim):
+                    return False
+            
+            # An EmbeddingBatch already holds one (N, D) matrix; otherwise fill a single
+            # preallocated float32 matrix row by row (one allocation, one copy per vector)
+            batch_vectors = getattr(embeddings, 'vectors', None)
+            if batch_vectors is None:
+                vectors_array = np.empty((len(embeddings), embeddings[0].embedding_dim), dtype='float32')
+                for i, emb in enumerate(embeddings):
+                    vectors_array[i] = emb.embedding
+            else:
+                # Copy: the vectors are normalized in place below and belong to the caller
+                vectors_array = np.array(batch_vectors, dtype='float32', order='C')
+            
+            # Unit length makes inner product equal cosine similarity (in-place, SIMD)
+            faiss.normalize_L2(vectors_array)
+            
+            if self.index_type == 'ivfpq':
+                return self._upsert_ivfpq(embeddings, vectors_array, persist)
             
-            # Prepare vectors and metadata
-            vectors = []
+            if self.quantize == 'binary':
+                vectors_array = np.packbits(vectors_array > 0, axis=1)
+            
+            self._index_keywords(embeddings)
+            
+            # Prepare metadata
             for emb in embeddings:
-                vectors.append(emb.embedding.astype('float32'))
-                
                 # Store metadata
                 self.metadata[emb.chunk_id] = {
                     'source_file': emb.source_file,
@@ -146,15 +381,21 @@ class LocalVectorDB:
                     'embedding_dim': emb.embedding_dim,
                     **emb.metadata
                 }
-            
-            # Convert to numpy array
-            vectors_array = np.vstack(vectors).astype('float32')
+            self._append_ids(embeddings)
             
             # Add vectors to index
-            self.index.add(vectors_array)
+            if self.index.is_trained:
+                self.index.add(vectors_array)
+            else:
+                # The int8 scalar quantizer learns per-dimension ranges; a single batch is
+                # too small a sample, so hold vectors back until there are enough to train on
+                self._untrained_vectors.append(vectors_array)
+                if sum(len(vectors) for vectors in self._untrained_vectors) >= self.INT8_TRAIN_SIZE:
+                    self._train_scalar_quantizer()
             
             # Save index and metadata
-            self._save_index()
+            if persist:
+                self._save_index()
             
             self.logger.info(f"Upserted {len(embeddings)} embeddings to local index")
             return True
@@ -163,6 +404,180 @@ class LocalVectorDB:
             self.logger.error(f"Failed to upsert embeddings to local index: {str(e)}")
             return False
     
+    def flush(self, index_name: str = None) -> bool:
+        """
+        Save the index, metadata and stored vectors to disk
+        
+        Args:
+            index_name: Index name (ignored for local DB)
+            
+        Returns:
+            True if successful
+        """
+        if self._refuse_write("flush index"):
+            return False
+        return self._save_index()
+    
+    def _select_device(self, device: str) -> str:
+        """Validate a device name, creating the GPU resources on first use of 'gpu'"""
+        if device not in self.DEVICES:
+            raise ValueError(f"Unsupported device: {device}. Supported: {', '.join(self.DEVICES)}")
+        if device == 'gpu' and self._gpu_resources is None:
+            if not hasattr(faiss, 'StandardGpuResources') or faiss.get_num_gpus() == 0:
+                self.logger.warning("GPU search requested but this FAISS build has no GPU support "
+                                    "or no GPU is visible; using the CPU")
+                return 'cpu'
+            self._gpu_resources = faiss.StandardGpuResources()
+        return device
+    
+    def _to_device(self, index):
+        """
+        Move a CPU index to the selected device
+        
+        Args:
+            index: CPU FAISS index
+            
+        Returns:
+            A GPU copy of the index when device is 'gpu' and FAISS supports the layout
+            on GPU, otherwise the index itself
+        """
+        self._index_on_gpu = False
+        # FAISS has no GPU version of HNSW, flat scalar-quantizer or binary indexes
+        if self.device != 'gpu' or self.quantize != 'none' or self.index_type == 'hnsw':
+            return index
+        try:
+            gpu_index = faiss.index_cpu_to_gpu(self._gpu_resources, 0, index)
+        except Exception as e:
+            self.logger.warning(f"Keeping the index on the CPU; GPU copy failed: {str(e)}")
+            return index
+        self._index_on_gpu = True
+        return gpu_index
+    
+    def _refuse_write(self, operation: str) -> bool:
+        """Log and return True if this database was opened read-only"""
+        if self.read_only:
+            self.logger.error(f"Cannot {operation}: local index was opened read-only")
+        return self.read_only
+    
+    def _append_ids(self, embeddings: List):
+        """Record the chunk ids of vectors about to be appended to the index"""
+        new_ids = np.empty(len(embeddings), dtype=object)
+        new_ids[:] = [emb.chunk_id for emb in embeddings]
+        self._id_list = np.concatenate([self._id_list, new_ids])
+    
+    def _train_scalar_quantizer(self):
+        """Train the int8 index on the buffered vectors, then add them to it"""
+        training_vectors = np.concatenate(self._untrained_vectors)
+        self.index.train(training_vectors)
+        self.index.add(training_vectors)
+        self._untrained_vectors = []
+        self.logger.info(f"Trained int8 scalar quantizer on {len(training_vectors)} vectors")
+    
+    def _upsert_ivfpq(self, embeddings: List, vectors_array: np.ndarray, persist: bool = True) -> bool:
+        """
+        Store vectors for the ivfpq layout, training the index once enough have arrived
+        
+        Args:
+            embeddings: EmbeddingResult objects (for metadata)
+            vectors_array: Their (N, D) float32 vectors
+            persist: Save the index to disk afterwards
+            
+        Returns:
+            True if successful
+        """
+        self._index_keywords(embeddings)
+        for emb in embeddings:
+            self.metadata[emb.chunk_id] = {
+                'source_file': emb.source_file,
+                'content': emb.content,
+                'model_name': emb.model_name,
+                'embedding_dim': emb.embedding_dim,
+                **emb.metadata
+            }
+        start = len(self._id_list)
+        self._append_ids(embeddings)
+        
+        if self.index is None:
+            self._raw_tail.append(vectors_array)
+            if self._raw_count() >= self.IVFPQ_TRAIN_SIZE:
+                # Train on everything stored so far, then index it all
+                training_vectors = self._stored_raw_vectors()
+                self.index = self._to_device(self._build_ivfpq_index(training_vectors))
+                self.index.add_with_ids(training_vectors, np.arange(len(training_vectors), dtype='int64'))
+                if not self.rerank:
+                    # The PQ codes now stand in for the vectors
+                    self.raw_vectors = None
+        else:
+            # Explicit ids keep the positional mapping onto metadata order used by search
+            self.index.add_with_ids(vectors_array, np.arange(start, start + len(vectors_array), dtype='int64'))
+            if self.rerank:
+                self._raw_tail.append(vectors_array)
+        
+        if persist:
+            self._save_index()
+        
+        self.logger.info(f"Upserted {len(embeddings)} embeddings to local index")
+        return True
+    
+    def _search_params(self, top_k: int, **kwargs):
+        """
+        Build FAISS search parameters for one call
+        
+        Args:
+            top_k: Number of results requested
+            **kwargs: 'nprobe' for a trained ivfpq index, 'ef_search' for hnsw
+            
+        Returns:
+            faiss.SearchParametersIVF / SearchParametersHNSW, or None for the index defaults
+        """
+        if self.index_type == 'ivfpq' and self.index is not None and 'nprobe' in kwargs:
+            return faiss.SearchParametersIVF(nprobe=int(kwargs['nprobe']))
+        if self.index_type == 'hnsw':
+            # Wider candidate lists trade speed for recall; never below the result count
+            return faiss.SearchParametersHNSW(efSearch=max(int(kwargs.get('ef_search', self.ef_search)), top_k))
+        return None
+    
+    def _search_ivfpq(self, query_vectors: np.ndarray, top_k: int, params=None):
+        """
+        Search the ivfpq layout: exact scan before training, else IVF-PQ with optional re-ranking
+        
+        Args:
+            query_vectors: (B, D) float32 queries
+            top_k: Number of results per query
+            params: Optional faiss.SearchParametersIVF (ignored before training)
+            
+        Returns:
+            (scores, indices) arrays of shape (B, k), indices padded with -1
+        """
+        if self.index is None:
+            return self._search_exact(query_vectors, self._stored_raw_vectors(), top_k)
+        
+        if not self.rerank or not self._raw_count():
+            return self.index.search(query_vectors, min(top_k, self.index.ntotal), params=params)
+        raw_vectors = self._stored_raw_vectors()
+        
+        # PQ codes only approximate the vectors; re-score a wider candidate set exactly
+        n_candidates = min(max(top_k, self.RERANK_CANDIDATES), self.index.ntotal)
+        _, candidates = self.index.search(query_vectors, n_candidates, params=params)
+        
+        k = min(top_k, n_candidates)
+        scores = np.full((len(query_vectors), k), -np.inf, dtype='float32')
+        indices = np.full((len(query_vectors), k), -1, dtype='int64')
+        for row, (query_vector, row_candidates) in enumerate(zip(query_vectors, candidates)):
+            row_candidates = row_candidates[row_candidates != -1]
+            exact_scores = np.einsum('ij,j->i', raw_vectors[row_candidates], query_vector)
+            order = np.argsort(-exact_scores)[:k]
+            scores[row, :len(order)] = exact_scores[order]
+            indices[row, :len(order)] = row_candidates[order]
+        return scores, indices
+    
+    @staticmethod
+    def _search_exact(query_vectors: np.ndarray, stored_vectors: np.ndarray, top_k: int):
+        """Score queries against every stored float32 vector with one (B, N) matmul"""
+        all_scores = query_vectors @ np.asarray(stored_vectors).T
+        order = np.argsort(-all_scores, axis=1)[:, :top_k]
+        return np.take_along_axis(all_scores, order, axis=1), order
+    
     def search(self, query_embedding: np.ndarray, index_name: str = None, 
               top_k: int = 10, **kwargs) -> List[SearchResult]:
         """
@@ -172,48 +587,129 @@ class LocalVectorDB:
             query_embedding: Query vector
             index_name: Index name (ignored for local DB)
             top_k: Number of results to return
-            **kwargs: Additional search parameters
+            **kwargs: Additional search parameters ('nprobe' for ivfpq, 'ef_search' for hnsw)
             
         Returns:
             List of SearchResult objects
         """
+        query_vector = np.asarray(query_embedding).reshape(1, -1)
+        return self.search_batch(query_vector, index_name, top_k, **kwargs)[0]
+    
+    def search_batch(self, query_embeddings: np.ndarray, index_name: str = None,
+                     top_k: int = 10, **kwargs) -> List[List[SearchResult]]:
+        """
+        Search for several query vectors with a single FAISS call
+        
+        Args:
+            query_embeddings: (B, D) query vectors
+            index_name: Index name (ignored for local DB)
+            top_k: Number of results to return per query
+            **kwargs: Additional search parameters ('nprobe' for ivfpq, 'ef_search' for hnsw)
+            
+        Returns:
+            One list of SearchResult objects per query, in query order
+        """
+        # Copied so the caller's array is untouched, then normalized to match the stored vectors
+        query_vectors = np.array(query_embeddings, dtype='float32', order='C', ndmin=2)
+        faiss.normalize_L2(query_vectors)
         try:
-            if not self.is_trained or self.index is None:
+            if not self.is_trained or (self.index is None and not self._raw_count()):
                 self.logger.warning("Index not trained or empty")
-                return []
+                return [[] for _ in range(len(query_vectors))]
             
-            # Ensure query is normalized for cosine similarity
-            query_vector = query_embedding.astype('float32').reshape(1, -1)
+            # Per-call parameters, so concurrent searches don't overwrite each other's settings
+            params = self._search_params(top_k, **kwargs)
             
             # Search
-            scores, indices = self.index.search(query_vector, min(top_k, self.index.ntotal))
+            if self.index_type == 'ivfpq':
+                scores, indices = self._search_ivfpq(query_vectors, top_k, params)
+            elif self._untrained_vectors:
+                # int8 index still collecting its training sample
+                scores, indices = self._search_exact(query_vectors, np.concatenate(self._untrained_vectors), top_k)
+            elif self.quantize == 'binary':
+                distances, indices = self.index.search(
+                    np.packbits(query_vectors > 0, axis=1), min(top_k, self.index.ntotal)
+                )
+                # Map Hamming distance to a [0, 1] similarity so min_score filters still apply
+                scores = 1.0 - distances / float(self.dimension)
+            else:
+                scores, indices = self.index.search(query_vectors, min(top_k, self.index.ntotal), params=params)
             
             # Convert to SearchResult objects
-            results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx == -1:  # No more results
-                    break
-                
-                # Get chunk ID from index position
-                chunk_ids = list(self.metadata.keys())
-                if idx < len(chunk_ids):
-                    chunk_id = chunk_ids[idx]
-                    metadata = self.metadata[chunk_id]
+            batch_results = []
+            for row_scores, row_indices in zip(scores, indices):
+                results = []
+                for score, idx in zip(row_scores, row_indices):
+                    if idx == -1:  # No more results
+                        break
                     
-                    result = SearchResult(
-                        chunk_id=chunk_id,
-                        content=metadata.get('content', ''),
-                        source_file=metadata.get('source_file', ''),
-                        score=float(score),
-                        metadata=metadata
-                    )
-                    results.append(result)
-            
-            self.logger.info(f"Found {len(results)} results for query")
-            return results
+                    # Get chunk ID from index position
+                    if idx < len(self._id_list):
+                        chunk_id = self._id_list[idx]
+                        metadata = self.metadata[chunk_id]
+                        
+                        result = SearchResult(
+                            chunk_id=chunk_id,
+                            content=metadata.get('content', ''),
+                            source_file=metadata.get('source_file', ''),
+                            score=float(score),
+                            metadata=metadata
+                        )
+                        results.append(result)
+                batch_results.append(results)
+            
+            self.logger.info(f"Found {sum(len(r) for r in batch_results)} results for {len(batch_results)} queries")
+            return batch_results
             
         except Exception as e:
             self.logger.error(f"Failed to search local index: {str(e)}")
+            return [[] for _ in range(len(query_vectors))]
+    
+    def keyword_search(self, keywords: List[str], index_name: str = None,
+                       top_k: int = 10) -> List[SearchResult]:
+        """
+        Full-text search over chunk content, ranked by BM25
+        
+        Args:
+            keywords: Query terms; chunks matching any of them are returned
+            index_name: Index name (ignored for local DB)
+            top_k: Number of results to return
+            
+        Returns:
+            List of SearchResult objects, best match first
+        """
+        if self._keyword_db is None or not keywords:
+            return []
+        
+        # Quote each term so FTS5 query syntax in user input is matched literally
+        match_query = ' OR '.join('"' + keyword.replace('"', '""') + '"' for keyword in keywords)
+        try:
+            with self._keyword_lock:
+                rows = self._keyword_db.execute(
+                    "SELECT chunk_id, bm25(chunks) FROM chunks WHERE chunks MATCH ? ORDER BY rank LIMIT ?",
+                    (match_query, top_k)
+                ).fetchall()
+            
+            results = []
+            for chunk_id, rank in rows:
+                metadata = self.metadata.get(chunk_id)
+                if metadata is None:
+                    continue
+                # bm25() is negative, more so for better matches; map it onto [0, 1)
+                relevance = -rank
+                results.append(SearchResult(
+                    chunk_id=chunk_id,
+                    content=metadata.get('content', ''),
+                    source_file=metadata.get('source_file', ''),
+                    score=relevance / (1.0 + relevance),
+                    metadata=metadata
+                ))
+            
+            self.logger.info(f"Found {len(results)} keyword results")
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Failed to search local keyword index: {str(e)}")
             return []
     
     def get_stats(self, index_name: str = None) -> Dict[str, Any]:
@@ -227,14 +723,18 @@ class LocalVectorDB:
             Dictionary with index statistics
         """
         try:
-            if not self.is_trained or self.index is None:
+            if not self.is_trained or (self.index is None and not self._raw_count()):
                 return {'total_vectors': 0, 'dimension': 0}
             
+            untrained = sum(len(vectors) for vectors in self._untrained_vectors)
             return {
-                'total_vectors': self.index.ntotal,
+                'total_vectors': untrained + (self.index.ntotal if self.index is not None else self._raw_count()),
                 'dimension': self.dimension,
                 'is_trained': self.is_trained,
                 'index_type': 'faiss_local',
+                'faiss_index_type': self.index_type,
+                'quantize': self.quantize,
+                'device': 'gpu' if self._index_on_gpu else 'cpu',
                 'metadata_entries': len(self.metadata)
             }
             
@@ -242,42 +742,262 @@ class LocalVectorDB:
             self.logger.error(f"Failed to get local index stats: {str(e)}")
             return {}
     
-    def _save_index(self):
-        """Save FAISS index and metadata to disk"""
+    def _build_ivfpq_index(self, training_vectors: np.ndarray):
+        """
+        Build and train an IVF-PQ index on the stored vectors
+        
+        The cluster count and code size are clamped so the training set is large
+        enough: FAISS needs at least as many training points as centroids.
+        
+        Args:
+            training_vectors: (N, D) float32 array used to train the index
+            
+        Returns:
+            Trained faiss.IndexIVFPQ
+        """
+        n_train = len(training_vectors)
+        # About sqrt(N) clusters, and at least 39 training points per centroid
+        nlist = max(1, min(self.nlist, int(np.sqrt(n_train)), n_train // 39))
+        pq_nbits = max(1, min(self.pq_nbits, int(np.log2(n_train)))) if n_train > 1 else 1
+        pq_m = self.pq_m if self.dimension % self.pq_m == 0 else 1
+        
+        # Inner product on normalized vectors keeps scores as cosine similarity
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        index = faiss.IndexIVFPQ(quantizer, self.dimension, nlist, pq_m, pq_nbits,
+                                 faiss.METRIC_INNER_PRODUCT)
+        index.train(training_vectors)
+        index.nprobe = max(1, min(nlist // 4, 10))
+        
+        self.logger.info(f"Trained IVF-PQ index on {n_train} vectors "
+                         f"(nlist: {nlist}, m: {pq_m}, nbits: {pq_nbits})")
+        return index
+    
+    def _save_index(self) -> bool:
+        """Save FAISS index and metadata to disk, returning True if successful"""
         try:
+            raw_file = self.index_path / "raw_vectors.npy"
+            if self._raw_tail or (self.raw_vectors is not None and not isinstance(self.raw_vectors, np.memmap)):
+                self._save_raw_vectors()
+            elif self.raw_vectors is None and raw_file.exists():
+                # Dropped after training, or left over from an earlier ivfpq index at this path
+                raw_file.unlink()
+            
+            if self.index is None and self.raw_vectors is not None:
+                # ivfpq layout still below the training size: only vectors and metadata
+                self._save_metadata()
+            
+            if self._untrained_vectors:
+                # An int8 index is written trained: train on whatever has been buffered
+                self._train_scalar_quantizer()
+            
             if self.index is not None:
-                # Save FAISS index
+                # Save FAISS index (binary indexes use a separate file and writer)
                 index_file = self.index_path / "faiss_index.bin"
-                faiss.write_index(self.index, str(index_file))
+                binary_index_file = self.index_path / "faiss_index_binary.bin"
+                if self.quantize == 'binary':
+                    faiss.write_index_binary(self.index, str(binary_index_file))
+                    stale_file = index_file
+                else:
+                    # GPU indexes are serialized through a CPU copy
+                    cpu_index = faiss.index_gpu_to_cpu(self.index) if self._index_on_gpu else self.index
+                    faiss.write_index(cpu_index, str(index_file))
+                    stale_file = binary_index_file
+                
+                # Drop the other format's file so the next load picks up this index
+                if stale_file.exists():
+                    stale_file.unlink()
                 
                 # Save metadata
-                metadata_file = self.index_path / "metadata.pkl"
-                with open(metadata_file, 'wb') as f:
-                    pickle.dump(self.metadata, f)
+                self._save_metadata()
                 
                 self.logger.info(f"Saved index to {self.index_path}")
+            return True
                 
         except Exception as e:
             self.logger.error(f"Failed to save local index: {str(e)}")
+            return False
+    
+    def _build_keyword_index(self):
+        """Open keywords.db, creating it from the loaded metadata if it is missing or empty"""
+        keyword_file = self.index_path / "keywords.db"
+        try:
+            if self.read_only:
+                if not keyword_file.exists():
+                    return
+                connection = sqlite3.connect(f"{keyword_file.as_uri()}?mode=ro", uri=True,
+                                             check_same_thread=False)
+            else:
+                connection = sqlite3.connect(str(keyword_file), check_same_thread=False)
+                connection.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS chunks "
+                    "USING fts5(chunk_id UNINDEXED, content, tokenize='porter unicode61')"
+                )
+            self._keyword_db = connection
+            
+            # Backfill indexes saved before the keyword index existed
+            if not self.read_only and self.metadata:
+                if connection.execute("SELECT count(*) FROM chunks").fetchone()[0] == 0:
+                    with self._keyword_lock, connection:
+                        connection.executemany(
+                            "INSERT INTO chunks (chunk_id, content) VALUES (?, ?)",
+                            ((chunk_id, entry.get('content', '')) for chunk_id, entry in self.metadata.items())
+                        )
+                    self.logger.info(f"Built keyword index for {len(self.metadata)} chunks")
+                    
+        except sqlite3.Error as e:
+            # e.g. an SQLite build without FTS5: keyword search then returns no results
+            self.logger.warning(f"Keyword index unavailable: {str(e)}")
+            self._close_keyword_index()
+    
+    def _index_keywords(self, embeddings: List):
+        """Add (or replace) the content of chunks about to be upserted in the keyword index"""
+        if self._keyword_db is None:
+            return
+        # Called before self.metadata is updated, so it tells which chunks are already indexed
+        replaced_ids = [(emb.chunk_id,) for emb in embeddings if emb.chunk_id in self.metadata]
+        with self._keyword_lock, self._keyword_db:
+            if replaced_ids:
+                self._keyword_db.executemany("DELETE FROM chunks WHERE chunk_id = ?", replaced_ids)
+            self._keyword_db.executemany(
+                "INSERT INTO chunks (chunk_id, content) VALUES (?, ?)",
+                ((emb.chunk_id, emb.content) for emb in embeddings)
+            )
+    
+    def _clear_keyword_index(self):
+        """Remove every chunk from the keyword index, if open"""
+        if self._keyword_db is None:
+            return
+        with self._keyword_lock, self._keyword_db:
+            self._keyword_db.execute("DELETE FROM chunks")
+    
+    def _close_keyword_index(self):
+        """Close the keyword index connection, if open"""
+        if self._keyword_db is not None:
+            with self._keyword_lock:
+                self._keyword_db.close()
+            self._keyword_db = None
+    
+    def _save_metadata(self):
+        """
+        Write chunk metadata next to the index
+        
+        metadata.json holds the ids in index order and the metadata by chunk id. A
+        legacy metadata.pkl is removed once the metadata has been rewritten.
+        """
+        metadata_file = self.index_path / "metadata.json"
+        temp_file = self.index_path / "metadata.tmp.json"
+        temp_file.write_bytes(_dump_json({'chunk_ids': list(self._id_list), 'metadata': self.metadata}))
+        
+        os.replace(temp_file, metadata_file)
+        legacy_file = self.index_path / "metadata.pkl"
+        if legacy_file.exists():
+            legacy_file.unlink()
+    
+    def _metadata_file(self) -> Optional[Path]:
+        """Return the saved metadata file, if any"""
+        for file_name in ("metadata.json", "metadata.pkl"):
+            metadata_file = self.index_path / file_name
+            if metadata_file.exists():
+                return metadata_file
+        return None
+    
+    def _load_metadata(self, metadata_file: Path):
+        """Read chunk metadata written by _save_metadata and rebuild the id list"""
+        if metadata_file.suffix == '.json':
+            saved = _load_json(metadata_file.read_bytes())
+            chunk_ids = saved['chunk_ids']
+            self.metadata = saved['metadata']
+        else:
+            # Indexes saved before metadata.json; rewritten in a safe format on the next save
+            self.logger.warning(f"Loading legacy pickled metadata from {metadata_file}")
+            with open(metadata_file, 'rb') as f:
+                self.metadata = pickle.load(f)
+            chunk_ids = list(self.metadata.keys())
+        
+        self._id_list = np.empty(len(chunk_ids), dtype=object)
+        self._id_list[:] = chunk_ids
+    
+    @staticmethod
+    def _scalar_quantizer_mode(index) -> str:
+        """Map a loaded IndexScalarQuantizer back to its quantize mode"""
+        qtype = index.sq.qtype
+        if qtype == faiss.ScalarQuantizer.QT_fp16:
+            return 'fp16'
+        if qtype == getattr(faiss.ScalarQuantizer, 'QT_bf16', None):
+            return 'bf16'
+        return 'int8'
+    
+    def _raw_count(self) -> int:
+        """Number of stored float32 vectors, on disk and in the unsaved tail"""
+        stored = 0 if self.raw_vectors is None else len(self.raw_vectors)
+        return stored + sum(len(vectors) for vectors in self._raw_tail)
+    
+    def _stored_raw_vectors(self) -> Optional[np.ndarray]:
+        """Return all stored float32 vectors, folding the unsaved tail in first"""
+        if self._raw_tail:
+            parts = self._raw_tail if self.raw_vectors is None else [self.raw_vectors] + self._raw_tail
+            self.raw_vectors = np.ascontiguousarray(np.concatenate(parts))
+            self._raw_tail = []
+        return self.raw_vectors
+    
+    def _save_raw_vectors(self):
+        """Write the stored float32 vectors and reopen them memory-mapped"""
+        raw_file = self.index_path / "raw_vectors.npy"
+        temp_file = self.index_path / "raw_vectors.tmp.npy"
+        np.save(temp_file, self._stored_raw_vectors())
+        # Replace atomically: the old file may still be mapped by self.raw_vectors
+        os.replace(temp_file, raw_file)
+        self.raw_vectors = np.load(raw_file, mmap_mode='r')
     
     def _load_index(self):
         """Load existing FAISS index and metadata from disk"""
         try:
             index_file = self.index_path / "faiss_index.bin"
-            metadata_file = self.index_path / "metadata.pkl"
+            binary_index_file = self.index_path / "faiss_index_binary.bin"
+            raw_file = self.index_path / "raw_vectors.npy"
+            metadata_file = self._metadata_file()
+            metadata_exists = metadata_file is not None
             
-            if index_file.exists() and metadata_file.exists():
+            if raw_file.exists() and metadata_exists:
+                self.raw_vectors = np.load(raw_file, mmap_mode='r')
+                # Stored vectors without an index file: ivfpq layout not trained yet
+                self.index_type = 'ivfpq'
+            
+            # Read-only databases memory-map the index file. FAISS only maps IVF inverted
+            # lists, so ivfpq codes are paged in on demand; other layouts still load into RAM
+            io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if self.read_only else 0
+            
+            if binary_index_file.exists() and metadata_exists:
+                self.index = faiss.read_index_binary(str(binary_index_file), io_flags)
+                self.quantize = 'binary'
+            elif index_file.exists() and metadata_exists:
                 # Load FAISS index
-                self.index = faiss.read_index(str(index_file))
-                
+                self.index = faiss.read_index(str(index_file), io_flags)
+                if isinstance(self.index, faiss.IndexScalarQuantizer):
+                    self.quantize = self._scalar_quantizer_mode(self.index)
+                # The saved index decides the layout, whatever index_type was requested
+                if isinstance(self.index, faiss.IndexIVFPQ):
+                    self.index_type = 'ivfpq'
+                elif isinstance(self.index, faiss.IndexHNSWFlat):
+                    self.index_type = 'hnsw'
+                    self.ef_search = self.index.hnsw.efSearch
+                else:
+                    self.index_type = 'flat'
+                self.index = self._to_device(self.index)
+            
+            if self.index is not None and not self.rerank:
+                # A trained index without re-ranking has no use for the stored vectors
+                self.raw_vectors = None
+            
+            if self.index is not None or self.raw_vectors is not None:
                 # Load metadata
-                with open(metadata_file, 'rb') as f:
-                    self.metadata = pickle.load(f)
+                self._load_metadata(metadata_file)
                 
-                self.dimension = self.index.d
+                self.dimension = self.index.d if self.index is not None else self.raw_vectors.shape[1]
                 self.is_trained = True
                 
-                self.logger.info(f"Loaded existing index with {self.index.ntotal} vectors")
+                total = self.index.ntotal if self.index is not None else len(self.raw_vectors)
+                self.logger.info(f"Loaded existing index with {total} vectors")
                 
         except Exception as e:
             self.logger.info(f"No existing index found or failed to load: {str(e)}")
@@ -10,16 +10,30 @@ Version: 1.0
 import logging
 import numpy as np
 from typing import List, Dict, Optional, Union, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import re
 import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
 from datetime import datetime
 
 from .embeddings_generator import ClaimsEmbeddingsGenerator, EmbeddingResult
-from .vector_database import VectorDatabaseManager, SearchResult
 
-@dataclass
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+from .vector_database import VectorDatabaseManager, SearchResult, DATACLASS_SLOTS
+
+# Keyword tokenizer (\w+ runs are already word-bounded) and stop words, built once
+_WORD_RE = re.compile(r'\w+')
+_STOP_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'})
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class SearchQuery:
     """Represents a search query with parameters"""
     query_text: str
@@ -28,7 +42,7 @@ class SearchQuery:
     min_score: float = 0.0
     filters: Dict[str, Any] = None
 
-@dataclass
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class SearchResponse:
     """Represents a search response"""
     query: SearchQuery
@@ -38,13 +52,166 @@ class SearchResponse:
     search_type: str
     metadata: Dict[str, Any] = None
 
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _merge_scores_numba(codes, scores, weights, n_unique):
+        """Sum weighted scores per chunk code in one compiled pass"""
+        combined = np.zeros(n_unique)
+        for i in range(codes.shape[0]):
+            combined[codes[i]] += scores[i] * weights[i]
+        return combined
+
+def merge_scores(codes: np.ndarray, scores: np.ndarray, weights: np.ndarray, n_unique: int) -> np.ndarray:
+    """
+    Sum weighted scores of results that share a chunk
+    
+    Uses a compiled Numba kernel when numba is installed, otherwise np.bincount.
+    
+    Args:
+        codes: int64 chunk code of each result, in [0, n_unique)
+        scores: float64 score of each result
+        weights: float64 weight of each result's search method
+        n_unique: Number of distinct chunks
+        
+    Returns:
+        float64 array of combined scores, indexed by chunk code
+    """
+    if NUMBA_AVAILABLE:
+        return _merge_scores_numba(codes, scores, weights, n_unique)
+    return np.bincount(codes, weights=scores * weights, minlength=n_unique)
+
+def _filter_predicate(filter_value):
+    """Return a function testing a metadata value against one filter (a value or a list of allowed values)"""
+    if isinstance(filter_value, list):
+        try:
+            allowed = frozenset(filter_value)
+        except TypeError:
+            # Unhashable allowed values: fall back to a linear scan
+            return lambda value: value in filter_value
+        
+        def matches(value):
+            try:
+                return value in allowed
+            except TypeError:
+                return value in filter_value
+        return matches
+    return lambda value: value == filter_value
+
+class QueryBatcher:
+    """
+    Coalesces concurrent vector searches into batched vector database calls
+    
+    Requests arriving within window_ms of the first one in a batch are answered by a
+    single search_batch call per distinct set of search parameters, so FAISS scores
+    them with one matrix product instead of one Python-to-C round trip per request.
+    """
+    
+    def __init__(self, vector_db: VectorDatabaseManager, index_name: str,
+                 window_ms: float = 5.0, max_batch_size: int = 64):
+        """
+        Args:
+            vector_db: Vector database to search
+            index_name: Index to search
+            window_ms: How long to wait for more queries after the first one
+            max_batch_size: Maximum queries per search_batch call
+        """
+        self.vector_db = vector_db
+        self.index_name = index_name
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._requests = queue.Queue()
+        # Guards _closed so no query is queued behind the stop marker
+        self._lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self._worker.start()
+    
+    def search(self, query_embedding: np.ndarray, top_k: int, **kwargs) -> List[SearchResult]:
+        """
+        Queue one query and block until its batch has been searched
+        
+        Args:
+            query_embedding: Query vector
+            top_k: Number of results to return
+            **kwargs: Search parameters passed on to search_batch ('nprobe', 'ef_search');
+                queries are only batched with others that use the same values
+            
+        Returns:
+            List of SearchResult objects
+        """
+        try:
+            params = tuple(sorted(kwargs.items()))
+            hash(params)
+        except TypeError:
+            # Unhashable parameter values cannot be grouped; search this query on its own
+            return self.vector_db.search(query_embedding, self.index_name, top_k=top_k, **kwargs)
+        
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("QueryBatcher is closed")
+            self._requests.put((np.asarray(query_embedding, dtype='float32').ravel(), top_k, params, future))
+        return future.result()
+    
+    def close(self):
+        """Answer the queries already queued, then stop the worker thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._requests.put(None)
+        self._worker.join()
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            request = self._requests.get()
+            if request is None:
+                return
+            batch = [request]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+            
+            # Queries with the same search parameters share a call
+            groups = {}
+            for request in batch:
+                groups.setdefault(request[2], []).append(request)
+            for params, group in groups.items():
+                self._search_group(group, dict(params))
+    
+    def _search_group(self, group: List, params: Dict[str, Any]):
+        """Search one group of queued queries with a single search_batch call"""
+        # One call at the largest requested k; each caller gets its own prefix
+        try:
+            max_k = max(top_k for _, top_k, _, _ in group)
+            batch_results = self.vector_db.search_batch(
+                np.vstack([vector for vector, _, _, _ in group]), self.index_name, top_k=max_k, **params
+            )
+            for (_, top_k, _, future), results in zip(group, batch_results):
+                future.set_result(results[:top_k])
+        except Exception as e:
+            for _, _, _, future in group:
+                future.set_exception(e)
+
 class ClaimsSearchAPI:
     """Search API for claims data with vector and keyword search"""
     
     def __init__(self, 
                  embeddings_generator: ClaimsEmbeddingsGenerator,
                  vector_db: VectorDatabaseManager,
-                 index_name: str = "claims-embeddings"):
+                 index_name: str = "claims-embeddings",
+                 batch_window_ms: float = 0.0):
         """
         Initialize the search API
         
@@ -52,24 +219,21 @@ class ClaimsSearchAPI:
             embeddings_generator: Instance of ClaimsEmbeddingsGenerator
             vector_db: Instance of VectorDatabaseManager
             index_name: Name of the vector database index
+            batch_window_ms: Window for coalescing concurrent vector searches into one
+                batched database call (0, the default, searches each query on its own;
+                a few ms helps servers handling many concurrent queries)
         """
         self.embeddings_generator = embeddings_generator
         self.vector_db = vector_db
         self.index_name = index_name
         self.logger = logging.getLogger(__name__)
-        
-        # Initialize keyword search index
-        self.keyword_index = {}
-        self._build_keyword_index()
+        self.query_batcher = QueryBatcher(vector_db, index_name, batch_window_ms) if batch_window_ms > 0 else None
     
-    def _build_keyword_index(self):
-        """Build keyword search index from existing data"""
-        try:
-            # This would typically load from a persistent keyword index
-            # For now, we'll build it dynamically during search
-            self.logger.info("Keyword index will be built dynamically during search")
-        except Exception as e:
-            self.logger.error(f"Failed to build keyword index: {str(e)}")
+    def close(self):
+        """Stop the query batcher's worker thread, if one was started"""
+        if self.query_batcher is not None:
+            self.query_batcher.close()
+            self.query_batcher = None
     
     def search(self, query: SearchQuery) -> SearchResponse:
         """
@@ -81,7 +245,7 @@ class ClaimsSearchAPI:
         Returns:
             SearchResponse object with results
         """
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         
         try:
             if query.search_type == "vector":
@@ -103,7 +267,7 @@ class ClaimsSearchAPI:
             # Limit results
             final_results = filtered_results[:query.top_k]
             
-            search_time = (datetime.now() - start_time).total_seconds() * 1000
+            search_time = (time.perf_counter() - start_time) * 1000
             
             response = SearchResponse(
                 query=query,
@@ -135,19 +299,18 @@ class ClaimsSearchAPI:
     def _vector_search(self, query: SearchQuery) -> List[SearchResult]:
         """Perform vector similarity search"""
         try:
-            # Generate embedding for query
-            query_embedding = self.embeddings_generator.generate_embedding(
-                query.query_text,
-                chunk_id="query",
-                metadata={'query': True}
-            )
+            # Embed the query; repeated queries come from the generator's per-model LRU cache
+            query_vector = self.embeddings_generator.embed_query(query.query_text)
             
-            # Search in vector database
-            results = self.vector_db.search(
-                query_embedding.embedding,
-                self.index_name,
-                top_k=query.top_k
-            )
+            # Search in vector database (batched with any concurrent queries)
+            if self.query_batcher is not None:
+                results = self.query_batcher.search(query_vector, query.top_k)
+            else:
+                results = self.vector_db.search(
+                    query_vector,
+                    self.index_name,
+                    top_k=query.top_k
+                )
             
             return results
             
@@ -158,23 +321,13 @@ class ClaimsSearchAPI:
     def _keyword_search(self, query: SearchQuery) -> List[SearchResult]:
         """Perform keyword-based search"""
         try:
-            # This is a simplified keyword search implementation
-            # In a production system, you'd use a proper search engine like Elasticsearch
-            
-            # Get all documents from vector database (this is not efficient for large datasets)
-            # In practice, you'd maintain a separate keyword index
-            
-            # For now, we'll simulate keyword search by searching through metadata
-            # This is a placeholder implementation
-            
-            results = []
             query_terms = self._extract_keywords(query.query_text)
+            if not query_terms:
+                return []
             
-            # This would typically search through a keyword index
-            # For demonstration, we'll return empty results
-            self.logger.warning("Keyword search is not fully implemented - requires keyword index")
-            
-            return results
+            # Ranked by the database's full-text index (BM25 for the local FAISS database;
+            # backends without one return no keyword results)
+            return self.vector_db.keyword_search(query_terms, self.index_name, top_k=query.top_k)
             
         except Exception as e:
             self.logger.error(f"Keyword search failed: {str(e)}")
@@ -202,81 +355,52 @@ class ClaimsSearchAPI:
         """Extract keywords from search text"""
         # Simple keyword extraction
         # Remove common stop words and extract meaningful terms
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
-        
-        # Extract words
-        words = re.findall(r'\b\w+\b', text.lower())
+        words = _WORD_RE.findall(text.lower())
         
         # Filter out stop words and short words
-        keywords = [word for word in words if len(word) > 2 and word not in stop_words]
+        keywords = [word for word in words if len(word) > 2 and word not in _STOP_WORDS]
         
         return keywords
     
     def _combine_search_results(self, vector_results: List[SearchResult], 
                                keyword_results: List[SearchResult]) -> List[SearchResult]:
         """Combine and rank results from different search methods"""
-        # Create a combined score for each result
-        combined_results = {}
+        all_results = vector_results + keyword_results
+        if not all_results:
+            return []
         
-        # Add vector results with weight
-        for result in vector_results:
-            chunk_id = result.chunk_id
-            combined_results[chunk_id] = {
-                'result': result,
-                'vector_score': result.score,
-                'keyword_score': 0.0,
-                'combined_score': result.score * 0.7  # 70% weight for vector search
-            }
+        # 70% weight for vector search, 30% for keyword search
+        weights = np.concatenate([np.full(len(vector_results), 0.7), np.full(len(keyword_results), 0.3)])
+        scores = np.fromiter((result.score for result in all_results), dtype=np.float64, count=len(all_results))
         
-        # Add keyword results with weight
-        for result in keyword_results:
-            chunk_id = result.chunk_id
-            if chunk_id in combined_results:
-                combined_results[chunk_id]['keyword_score'] = result.score
-                combined_results[chunk_id]['combined_score'] += result.score * 0.3  # 30% weight for keyword search
-            else:
-                combined_results[chunk_id] = {
-                    'result': result,
-                    'vector_score': 0.0,
-                    'keyword_score': result.score,
-                    'combined_score': result.score * 0.3
-                }
+        # Number chunk ids in first-seen order (one hash lookup each, no string sort)
+        code_of = {}
+        codes = np.fromiter((code_of.setdefault(result.chunk_id, len(code_of)) for result in all_results),
+                            dtype=np.int64, count=len(all_results))
+        # Position of each chunk's first result (its vector result if both methods found it)
+        first_index = np.unique(codes, return_index=True)[1]
         
-        # Sort by combined score
-        sorted_results = sorted(
-            combined_results.values(),
-            key=lambda x: x['combined_score'],
-            reverse=True
-        )
+        # Sum the weighted scores of each chunk found by either method
+        combined_scores = merge_scores(codes, scores, weights, len(first_index))
         
-        # Update scores in results
-        final_results = []
-        for item in sorted_results:
-            result = item['result']
-            result.score = item['combined_score']
-            final_results.append(result)
+        # Highest combined score first; ties keep the order the chunks were first seen
+        order = np.argsort(-combined_scores, kind='stable')
         
-        return final_results
+        # Results are frozen: return copies carrying the combined score (a chunk found by
+        # both methods keeps its vector result)
+        return [replace(all_results[first_index[i]], score=float(combined_scores[i])) for i in order]
     
     def _apply_filters(self, results: List[SearchResult], filters: Dict[str, Any]) -> List[SearchResult]:
         """Apply filters to search results"""
+        # Build each filter's membership test once, not per result
+        predicates = [(filter_key, _filter_predicate(filter_value)) for filter_key, filter_value in filters.items()]
+        
         filtered_results = []
         
         for result in results:
-            include = True
-            
-            for filter_key, filter_value in filters.items():
-                if filter_key in result.metadata:
-                    if isinstance(filter_value, list):
-                        if result.metadata[filter_key] not in filter_value:
-                            include = False
-                            break
-                    else:
-                        if result.metadata[filter_key] != filter_value:
-                            include = False
-                            break
-            
-            if include:
+            metadata = result.metadata
+            if all(filter_key not in metadata or matches(metadata[filter_key])
+                   for filter_key, matches in predicates):
                 filtered_results.append(result)
         
         return filtered_results
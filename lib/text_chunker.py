@@ -8,12 +8,37 @@ Version: 1.0
 """
 
 import re
+import bisect
 import logging
-from typing import List, Dict, Tuple, Optional
+import mmap
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple, Optional, Any
 from dataclasses import dataclass
 from pathlib import Path
 
-@dataclass
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
+# Control characters stripped from chunk text (tab, newline and carriage return are
+# whitespace and collapse to spaces instead), as a str.translate deletion table
+_CONTROL_CHARS = dict.fromkeys([*range(0x00, 0x09), 0x0b, 0x0c, *range(0x0e, 0x20), *range(0x7f, 0xa0)])
+
+# Line patterns that mark a chunk as containing a complete section
+_SECTION_INDICATORS = (
+    r'^[A-Z][A-Z\s]+:\s*$',  # Section header
+    r'^\d+\.\s+[A-Z]',       # Numbered item
+    r'^[A-Z][a-z]+\s+[A-Z][a-z]+:',  # Field name
+)
+
+# Attribute storage in __slots__ instead of a per-instance __dict__ (dataclass slots need Python 3.10+)
+DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class TextChunk:
     """Represents a chunk of text with metadata"""
     content: str
@@ -22,7 +47,7 @@ class TextChunk:
     chunk_index: int
     start_char: int
     end_char: int
-    metadata: Dict[str, any] = None
+    metadata: Optional[Dict[str, Any]] = None
 
 class ClaimsTextChunker:
     """Intelligent text chunker optimized for insurance claims data"""
@@ -30,7 +55,8 @@ class ClaimsTextChunker:
     def __init__(self, 
                  chunk_size: int = 512,
                  chunk_overlap: int = 50,
-                 min_chunk_size: int = 100):
+                 min_chunk_size: int = 100,
+                 use_re2: bool = False):
         """
         Initialize the text chunker
         
@@ -38,10 +64,15 @@ class ClaimsTextChunker:
             chunk_size: Target size for each chunk in characters
             chunk_overlap: Number of characters to overlap between chunks
             min_chunk_size: Minimum size for a valid chunk
+            use_re2: Match chunking patterns with google-re2's linear-time DFA engine
+                when it is installed (falls back to the re module). Off by default: RE2's
+                whitespace class only matches ASCII, so text with e.g. non-breaking spaces
+                chunks differently than with re
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.min_chunk_size = min_chunk_size
+        self.use_re2 = use_re2
         self.logger = logging.getLogger(__name__)
         
         # Patterns for identifying natural break points in claims data
@@ -53,8 +84,26 @@ class ClaimsTextChunker:
             r'\n\s*===+\s*$',            # Major separators
         ]
         
-        # Compile patterns for efficiency
-        self.compiled_patterns = [re.compile(pattern, re.MULTILINE) for pattern in self.section_patterns]
+        # Section patterns, sentence endings and paragraph breaks as one alternation, so the
+        # text is scanned once
+        alternatives = [f'(?P<p{i}>{pattern})' for i, pattern in enumerate(self.section_patterns)]
+        alternatives += [r'(?P<sent>[.!?]+\s+)', r'(?P<para>\n\s*\n)']
+        self._regex = re
+        if use_re2 and RE2_AVAILABLE:
+            try:
+                # RE2 has no lookahead, so matches cannot overlap (no difference once
+                # _clean_text has collapsed newlines)
+                self._break_re = re2.compile('(?m)' + '|'.join(alternatives))
+                self._regex = re2
+            except Exception as e:
+                self.logger.warning(f"google-re2 rejected the chunking patterns, using re: {str(e)}")
+        if self._regex is re:
+            # Each alternative sits in a lookahead so matches may overlap, exactly as when
+            # every pattern was scanned separately
+            self._break_re = re.compile('(?=' + '|'.join(alternatives) + ')', re.MULTILINE)
+        self._whitespace_re = self._regex.compile(r'\s+')
+        # All section indicators in one multiline alternation: one scan per chunk
+        self._section_re = self._regex.compile('(?m)' + '|'.join(_SECTION_INDICATORS))
     
     def chunk_text(self, text: str, source_file: str, file_metadata: Dict = None) -> List[TextChunk]:
         """
@@ -86,14 +135,11 @@ class ClaimsTextChunker:
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text for better chunking"""
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Normalize line breaks
-        text = re.sub(r'\n+', '\n', text)
+        # Remove excessive whitespace (line breaks included, so no separate newline pass)
+        text = self._whitespace_re.sub(' ', text)
         
-        # Remove special characters that might interfere with chunking
-        text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]', '', text)
+        # Remove special characters that might interfere with chunking (one C-level pass)
+        text = text.translate(_CONTROL_CHARS)
         
         return text.strip()
     
@@ -101,21 +147,13 @@ class ClaimsTextChunker:
         """Find natural break points in the text"""
         break_points = set()
         
-        # Add pattern-based break points
-        for pattern in self.compiled_patterns:
-            for match in pattern.finditer(text):
+        # Sections and paragraphs break where they start, sentences after their ending
+        for match in self._break_re.finditer(text):
+            if match.lastgroup == 'sent':
+                break_points.add(match.end('sent'))
+            else:
                 break_points.add(match.start())
         
-        # Add sentence boundaries as break points
-        sentence_endings = re.finditer(r'[.!?]+\s+', text)
-        for match in sentence_endings:
-            break_points.add(match.end())
-        
-        # Add paragraph boundaries
-        paragraph_breaks = re.finditer(r'\n\s*\n', text)
-        for match in paragraph_breaks:
-            break_points.add(match.start())
-        
         # Convert to sorted list
         break_points = sorted(list(break_points))
         
@@ -131,9 +169,14 @@ class ClaimsTextChunker:
         chunk_index = 0
         start_pos = 0
         
-        while start_pos < len(text):
+        # Loop invariants, computed once per document rather than once per chunk
+        text_length = len(text)
+        stem = Path(source_file).stem
+        shared_file_metadata = file_metadata or {}
+        
+        while start_pos < text_length:
             # Calculate end position
-            end_pos = min(start_pos + self.chunk_size, len(text))
+            end_pos = min(start_pos + self.chunk_size, text_length)
             
             # Try to find a good break point near the end
             best_break = self._find_best_break_point(text, start_pos, end_pos, break_points)
@@ -142,29 +185,27 @@ class ClaimsTextChunker:
             
             # Extract chunk content
             chunk_content = text[start_pos:end_pos].strip()
+            content_length = len(chunk_content)
             
             # Skip if chunk is too small
-            if len(chunk_content) < self.min_chunk_size:
+            if content_length < self.min_chunk_size:
                 start_pos = end_pos
                 continue
             
             # Create chunk
-            chunk_id = f"{Path(source_file).stem}_chunk_{chunk_index:03d}"
-            chunk = TextChunk(
+            chunks.append(TextChunk(
                 content=chunk_content,
-                chunk_id=chunk_id,
+                chunk_id=f"{stem}_chunk_{chunk_index:03d}",
                 source_file=source_file,
                 chunk_index=chunk_index,
                 start_char=start_pos,
                 end_char=end_pos,
                 metadata={
-                    'file_metadata': file_metadata or {},
-                    'chunk_size': len(chunk_content),
+                    'file_metadata': shared_file_metadata,
+                    'chunk_size': content_length,
                     'is_complete_section': self._is_complete_section(chunk_content)
                 }
-            )
-            
-            chunks.append(chunk)
+            ))
             chunk_index += 1
             
             # Move start position with overlap
@@ -178,26 +219,23 @@ class ClaimsTextChunker:
         # Look for break points within the last 20% of the chunk
         search_start = max(start, end - (self.chunk_size // 5))
         
-        for bp in reversed(break_points):
-            if search_start <= bp <= end:
-                return bp
+        # break_points is sorted: binary search for the last one at or before end
+        idx = bisect.bisect_right(break_points, end) - 1
+        if idx >= 0 and break_points[idx] >= search_start:
+            return break_points[idx]
         
         return end
     
     def _is_complete_section(self, chunk_content: str) -> bool:
         """Check if chunk contains a complete section"""
-        # Check for common section indicators
-        section_indicators = [
-            r'^[A-Z][A-Z\s]+:\s*$',  # Section header
-            r'^\d+\.\s+[A-Z]',       # Numbered item
-            r'^[A-Z][a-z]+\s+[A-Z][a-z]+:',  # Field name
-        ]
+        # Cheap rejection first: headers and field names need a colon, and a numbered item
+        # must start a line with a digit (cleaned chunks have no line breaks, so usually
+        # only the first character can qualify)
+        if ':' not in chunk_content and not chunk_content[:1].isdigit() and '\n' not in chunk_content:
+            return False
         
-        for pattern in section_indicators:
-            if re.search(pattern, chunk_content, re.MULTILINE):
-                return True
-        
-        return False
+        # Check for common section indicators
+        return self._section_re.search(chunk_content) is not None
     
     def chunk_file(self, file_path: str) -> List[TextChunk]:
         """
@@ -210,8 +248,14 @@ class ClaimsTextChunker:
             List of TextChunk objects
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
+            # Decode straight from a read-only mapping of the file: the only full-size
+            # copy is the decoded str, not an intermediate bytes buffer as well
+            with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    text = ''
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        text = str(mapped, 'utf-8')
             
             file_metadata = {
                 'file_path': file_path,
@@ -226,13 +270,15 @@ class ClaimsTextChunker:
             return []
     
     def chunk_directory(self, directory_path: str, 
-                       file_extensions: List[str] = None) -> List[TextChunk]:
+                       file_extensions: List[str] = None,
+                       max_workers: int = None) -> List[TextChunk]:
         """
         Chunk all text files in a directory
         
         Args:
             directory_path: Path to directory containing files
             file_extensions: List of file extensions to process (default: ['.txt'])
+            max_workers: Process pool size (defaults to the CPU count; 1 chunks in this process)
             
         Returns:
             List of TextChunk objects from all files
@@ -243,15 +289,42 @@ class ClaimsTextChunker:
         directory = Path(directory_path)
         all_chunks = []
         
-        for file_path in directory.rglob('*'):
-            if file_path.is_file() and file_path.suffix.lower() in file_extensions:
+        file_paths = [str(file_path) for file_path in directory.rglob('*')
+                      if file_path.is_file() and file_path.suffix.lower() in file_extensions]
+        workers = min(max_workers or os.cpu_count() or 1, len(file_paths))
+        
+        if workers <= 1:
+            for file_path in file_paths:
                 self.logger.info(f"Chunking file: {file_path}")
-                chunks = self.chunk_file(str(file_path))
-                all_chunks.extend(chunks)
+                all_chunks.extend(self.chunk_file(file_path))
+        else:
+            # Chunking is CPU-bound regex and string work, independent per file; results
+            # keep the directory listing order
+            self.logger.info(f"Chunking {len(file_paths)} files with {workers} worker processes")
+            with ProcessPoolExecutor(max_workers=workers,
+                                     initializer=_init_chunk_worker,
+                                     initargs=(self.chunk_size, self.chunk_overlap,
+                                               self.min_chunk_size, self.use_re2)) as executor:
+                for chunks in executor.map(_chunk_file_in_worker, file_paths):
+                    all_chunks.extend(chunks)
         
         self.logger.info(f"Total chunks created: {len(all_chunks)}")
         return all_chunks
 
+# Per-process chunker for chunk_directory workers, created by _init_chunk_worker
+_WORKER_CHUNKER = None
+
+def _init_chunk_worker(chunk_size=512, chunk_overlap=50, min_chunk_size=100, use_re2=False):
+    """Process pool initializer: build one ClaimsTextChunker (and its compiled patterns) per worker"""
+    global _WORKER_CHUNKER
+    _WORKER_CHUNKER = ClaimsTextChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                        min_chunk_size=min_chunk_size, use_re2=use_re2)
+
+def _chunk_file_in_worker(file_path: str) -> List[TextChunk]:
+    """Chunk one file in a worker process (module-level so it can be pickled)"""
+    chunker = _WORKER_CHUNKER if _WORKER_CHUNKER is not None else ClaimsTextChunker()
+    return chunker.chunk_file(file_path)
+
 def main():
     """Test the chunker with sample data"""
     import sys
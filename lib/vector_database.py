@@ -14,9 +14,15 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 import json
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 
-@dataclass
+# Attribute storage in __slots__ instead of a per-instance __dict__ (dataclass slots need Python 3.10+)
+DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class SearchResult:
     """Represents a search result from vector database"""
     chunk_id: str
@@ -25,6 +31,61 @@ class SearchResult:
     score: float
     metadata: Dict[str, Any]
 
+# Vectors per upsert request (Pinecone caps request size at 2 MB, ~100 vectors of 1024 dims)
+UPSERT_BATCH_SIZE = 100
+
+# Upsert requests kept in flight at once (each waits on an HTTPS round trip)
+UPSERT_THREADS = 16
+
+# Attempts per upsert request on rate limiting (429), server errors (5xx) or connection
+# failures, waiting UPSERT_RETRY_DELAY * 2**attempt seconds in between
+UPSERT_MAX_ATTEMPTS = 5
+UPSERT_RETRY_DELAY = 0.5
+
+# Precisions vector values can be sent in: float32, float16-rounded, or int8 codes
+UPSERT_PRECISIONS = ('fp32', 'fp16', 'int8')
+
+def iter_upsert_slices(embeddings, batch_size: int = UPSERT_BATCH_SIZE, precision: str = 'fp32'):
+    """
+    Yield embeddings in contiguous slices ready for one bulk upsert request each
+    
+    The vector values of a slice come from one tolist() call on a (rows, D) matrix
+    instead of one call per row. 'fp16' rounds values to float16; 'int8' sends each
+    vector as integers in [-127, 127] with a per-vector scale (vector ~ values * scale).
+    Only cosine similarity is unaffected by the scale, so int8 suits cosine indexes only.
+    
+    Args:
+        embeddings: EmbeddingBatch or list of EmbeddingResult objects
+        batch_size: Number of embeddings per slice
+        precision: One of UPSERT_PRECISIONS
+        
+    Yields:
+        (rows, values, scales) where rows is a list of EmbeddingResult objects, values
+        is the matching list of vector value lists and scales the per-vector int8
+        scales (None unless precision is 'int8')
+    """
+    if precision not in UPSERT_PRECISIONS:
+        raise ValueError(f"Unsupported precision: {precision}. Supported: {', '.join(UPSERT_PRECISIONS)}")
+    
+    vectors = getattr(embeddings, 'vectors', None)
+    for start in range(0, len(embeddings), batch_size):
+        stop = min(start + batch_size, len(embeddings))
+        rows = [embeddings[i] for i in range(start, stop)]
+        if vectors is not None:
+            block = vectors[start:stop]
+        else:
+            block = np.stack([row.embedding for row in rows])
+        
+        scales = None
+        if precision == 'fp16':
+            block = block.astype(np.float16)
+        elif precision == 'int8':
+            block = np.asarray(block, dtype=np.float32)
+            scales = np.maximum(np.abs(block).max(axis=1), 1e-12) / 127.0
+            block = np.rint(block / scales[:, None]).astype(np.int8)
+            scales = scales.tolist()
+        yield rows, block.tolist(), scales
+
 class VectorDatabaseInterface(ABC):
     """Abstract interface for vector database operations"""
     
@@ -39,16 +100,31 @@ class VectorDatabaseInterface(ABC):
         pass
     
     @abstractmethod
-    def upsert_embeddings(self, embeddings: List, index_name: str) -> bool:
-        """Insert or update embeddings"""
+    def upsert_embeddings(self, embeddings: List, index_name: str, persist: bool = True) -> bool:
+        """Insert or update embeddings (persist=False may defer saving until flush())"""
         pass
     
+    def flush(self, index_name: str) -> bool:
+        """Persist writes deferred by upsert_embeddings(persist=False) (nothing to do unless overridden)"""
+        return True
+    
     @abstractmethod
     def search(self, query_embedding: np.ndarray, index_name: str, 
               top_k: int = 10, **kwargs) -> List[SearchResult]:
         """Search for similar embeddings"""
         pass
     
+    def search_batch(self, query_embeddings: np.ndarray, index_name: str,
+                     top_k: int = 10, **kwargs) -> List[List[SearchResult]]:
+        """Search for several query vectors (one search per row unless overridden)"""
+        return [self.search(query_embedding, index_name, top_k, **kwargs)
+                for query_embedding in query_embeddings]
+    
+    def keyword_search(self, keywords: List[str], index_name: str,
+                       top_k: int = 10) -> List[SearchResult]:
+        """Full-text search for chunks containing any of the keywords (none unless overridden)"""
+        return []
+    
     @abstractmethod
     def get_stats(self, index_name: str) -> Dict[str, Any]:
         """Get index statistics"""
@@ -57,16 +133,26 @@ class VectorDatabaseInterface(ABC):
 class PineconeVectorDB(VectorDatabaseInterface):
     """Pinecone vector database implementation"""
     
-    def __init__(self, api_key: str = None, environment: str = None):
+    def __init__(self, api_key: str = None, environment: str = None, precision: str = 'fp32'):
         """
         Initialize Pinecone client
         
         Args:
             api_key: Pinecone API key (if None, will try to get from environment)
             environment: Pinecone environment (if None, will try to get from environment)
+            precision: Precision of upserted vector values ('fp32', 'fp16', or 'int8' for
+                integer codes with a per-vector scale stored in metadata); smaller values
+                mean smaller upsert requests. int8 is used for cosine indexes only (other
+                metrics rank on the scaled values) and falls back to fp16 elsewhere
         """
         self.logger = logging.getLogger(__name__)
         
+        if precision not in UPSERT_PRECISIONS:
+            raise ValueError(f"Unsupported precision: {precision}. Supported: {', '.join(UPSERT_PRECISIONS)}")
+        self.precision = precision
+        # Distance metric of each index upserted to so far (int8 needs a cosine index)
+        self._index_metrics = {}
+        
         # Get credentials from environment if not provided
         self.api_key = api_key or os.getenv('PINECONE_API_KEY')
         self.environment = environment or os.getenv('PINECONE_ENVIRONMENT', 'us-west1-gcp')
@@ -91,6 +177,10 @@ class PineconeVectorDB(VectorDatabaseInterface):
             # Default metric is cosine similarity
             metric = kwargs.get('metric', 'cosine')
             
+            if kwargs.get('quantize', 'none') != 'none':
+                self.logger.warning("quantize only applies to the local database; Pinecone stores float32 "
+                                    "(PineconeVectorDB(precision=...) shrinks upsert requests instead)")
+            
             # Check if index already exists
             if index_name in self.client.list_indexes().names():
                 self.logger.info(f"Index {index_name} already exists")
@@ -120,17 +210,45 @@ class PineconeVectorDB(VectorDatabaseInterface):
             self.logger.error(f"Failed to delete Pinecone index: {str(e)}")
             return False
     
-    def upsert_embeddings(self, embeddings: List, index_name: str) -> bool:
-        """Insert or update embeddings in Pinecone"""
+    def upsert_embeddings(self, embeddings: List, index_name: str, persist: bool = True) -> bool:
+        """Insert or update embeddings in Pinecone (each request is durable; persist is unused)"""
         try:
-            index = self.client.Index(index_name)
+            # A connection per concurrent request
+            index = self.client.Index(index_name, pool_threads=UPSERT_THREADS)
+            
+            # Scaled int8 codes only rank correctly under cosine similarity
+            precision = self.precision
+            if precision == 'int8' and self._index_metric(index_name) != 'cosine':
+                self.logger.warning(f"int8 upserts need a cosine index; sending fp16 values to {index_name}")
+                precision = 'fp16'
+            
+            # One upsert request per slice, built only shortly before it is sent; at most
+            # UPSERT_THREADS requests are in flight, so memory stays bounded
+            in_flight = set()
+            with ThreadPoolExecutor(max_workers=UPSERT_THREADS) as executor:
+                for batch in self._iter_upsert_batches(embeddings, precision):
+                    if len(in_flight) >= UPSERT_THREADS:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()  # re-raise a failed request
+                    in_flight.add(executor.submit(self._upsert_with_retry, index, batch))
+                for future in in_flight:
+                    future.result()
+            
+            self.logger.info(f"Upserted {len(embeddings)} embeddings to {index_name}")
+            return True
             
-            # Prepare vectors for upsert
-            vectors = []
-            for emb in embeddings:
-                vector_data = {
+        except Exception as e:
+            self.logger.error(f"Failed to upsert embeddings to Pinecone: {str(e)}")
+            return False
+    
+    def _iter_upsert_batches(self, embeddings, precision: str):
+        """Yield Pinecone upsert payloads (lists of vector dicts), one per request"""
+        for rows, values, scales in iter_upsert_slices(embeddings, precision=precision):
+            batch = [
+                {
                     'id': emb.chunk_id,
-                    'values': emb.embedding.tolist(),
+                    'values': vector_values,
                     'metadata': {
                         'source_file': emb.source_file,
                         'content': emb.content,
@@ -139,20 +257,27 @@ class PineconeVectorDB(VectorDatabaseInterface):
                         **emb.metadata
                     }
                 }
-                vectors.append(vector_data)
-            
-            # Upsert in batches
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                index.upsert(vectors=batch)
-            
-            self.logger.info(f"Upserted {len(embeddings)} embeddings to {index_name}")
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"Failed to upsert embeddings to Pinecone: {str(e)}")
-            return False
+                for emb, vector_values in zip(rows, values)
+            ]
+            if scales is not None:
+                for vector, scale in zip(batch, scales):
+                    vector['metadata']['vector_scale'] = scale
+            yield batch
+    
+    def _upsert_with_retry(self, index, batch: List[Dict[str, Any]]):
+        """Send one upsert request, retrying with exponential backoff on transient failures"""
+        for attempt in range(UPSERT_MAX_ATTEMPTS):
+            try:
+                return index.upsert(vectors=batch)
+            except Exception as e:
+                status = getattr(e, 'status', None) or getattr(e, 'status_code', None)
+                transient = isinstance(e, (ConnectionError, TimeoutError)) or \
+                    (isinstance(status, int) and (status == 429 or status >= 500))
+                if not transient or attempt == UPSERT_MAX_ATTEMPTS - 1:
+                    raise
+                delay = UPSERT_RETRY_DELAY * 2 ** attempt
+                self.logger.warning(f"Pinecone upsert failed ({str(e)}); retrying in {delay:.1f}s")
+                time.sleep(delay)
     
     def search(self, query_embedding: np.ndarray, index_name: str, 
               top_k: int = 10, **kwargs) -> List[SearchResult]:
@@ -186,6 +311,16 @@ class PineconeVectorDB(VectorDatabaseInterface):
             self.logger.error(f"Failed to search Pinecone: {str(e)}")
             return []
     
+    def _index_metric(self, index_name: str) -> Optional[str]:
+        """Distance metric of a Pinecone index, looked up once per index (None if unknown)"""
+        if index_name not in self._index_metrics:
+            try:
+                self._index_metrics[index_name] = self.client.describe_index(index_name).metric
+            except Exception as e:
+                self.logger.warning(f"Could not read the metric of Pinecone index {index_name}: {str(e)}")
+                return None
+        return self._index_metrics[index_name]
+    
     def get_stats(self, index_name: str) -> Dict[str, Any]:
         """Get Pinecone index statistics"""
         try:
@@ -232,6 +367,9 @@ class WeaviateVectorDB(VectorDatabaseInterface):
         try:
             class_name = index_name.replace('-', '_').title()
             
+            if kwargs.get('quantize', 'none') != 'none':
+                self.logger.warning("Weaviate backend does not support quantized vectors; storing float32")
+            
             # Check if class already exists
             if self.client.schema.exists(class_name):
                 self.logger.info(f"Class {class_name} already exists")
@@ -291,28 +429,29 @@ class WeaviateVectorDB(VectorDatabaseInterface):
             self.logger.error(f"Failed to delete Weaviate class: {str(e)}")
             return False
     
-    def upsert_embeddings(self, embeddings: List, index_name: str) -> bool:
-        """Insert or update embeddings in Weaviate"""
+    def upsert_embeddings(self, embeddings: List, index_name: str, persist: bool = True) -> bool:
+        """Insert or update embeddings in Weaviate (each batch is durable; persist is unused)"""
         try:
             class_name = index_name.replace('-', '_').title()
             
             # Prepare data for batch insert
             with self.client.batch as batch:
-                batch.batch_size = 100
-                for emb in embeddings:
-                    data_object = {
-                        "content": emb.content,
-                        "source_file": emb.source_file,
-                        "chunk_id": emb.chunk_id,
-                        "model_name": emb.model_name,
-                        "metadata": emb.metadata
-                    }
-                    
-                    batch.add_data_object(
-                        data_object=data_object,
-                        class_name=class_name,
-                        vector=emb.embedding.tolist()
-                    )
+                batch.batch_size = UPSERT_BATCH_SIZE
+                for rows, values, _ in iter_upsert_slices(embeddings):
+                    for emb, vector_values in zip(rows, values):
+                        data_object = {
+                            "content": emb.content,
+                            "source_file": emb.source_file,
+                            "chunk_id": emb.chunk_id,
+                            "model_name": emb.model_name,
+                            "metadata": emb.metadata
+                        }
+                        
+                        batch.add_data_object(
+                            data_object=data_object,
+                            class_name=class_name,
+                            vector=vector_values
+                        )
             
             self.logger.info(f"Upserted {len(embeddings)} embeddings to {class_name}")
             return True
@@ -372,7 +511,8 @@ class VectorDatabaseManager:
         Initialize vector database manager
         
         Args:
-            db_type: Type of database ('pinecone', 'weaviate', or 'local')
+            db_type: Type of database ('pinecone', 'weaviate', 'local', or 'faiss'
+                for a local FAISS IVF-PQ index)
             **kwargs: Additional arguments for database initialization
         """
         self.logger = logging.getLogger(__name__)
@@ -385,8 +525,12 @@ class VectorDatabaseManager:
         elif self.db_type == "local":
             from .local_vector_db import LocalVectorDB
             self.db = LocalVectorDB(**kwargs)
+        elif self.db_type == "faiss":
+            from .local_vector_db import LocalVectorDB
+            kwargs.setdefault('index_type', 'ivfpq')
+            self.db = LocalVectorDB(**kwargs)
         else:
-            raise ValueError(f"Unsupported database type: {db_type}. Supported: pinecone, weaviate, local")
+            raise ValueError(f"Unsupported database type: {db_type}. Supported: pinecone, weaviate, local, faiss")
         
         self.logger.info(f"Initialized {self.db_type} vector database manager")
     
@@ -398,15 +542,29 @@ class VectorDatabaseManager:
         """Delete an index"""
         return self.db.delete_index(index_name)
     
-    def upsert_embeddings(self, embeddings: List, index_name: str) -> bool:
-        """Insert or update embeddings"""
-        return self.db.upsert_embeddings(embeddings, index_name)
+    def upsert_embeddings(self, embeddings: List, index_name: str, persist: bool = True) -> bool:
+        """Insert or update embeddings (persist=False may defer saving until flush())"""
+        return self.db.upsert_embeddings(embeddings, index_name, persist)
+    
+    def flush(self, index_name: str) -> bool:
+        """Persist writes deferred by upsert_embeddings(persist=False)"""
+        return self.db.flush(index_name)
     
     def search(self, query_embedding: np.ndarray, index_name: str, 
               top_k: int = 10, **kwargs) -> List[SearchResult]:
         """Search for similar embeddings"""
         return self.db.search(query_embedding, index_name, top_k, **kwargs)
     
+    def search_batch(self, query_embeddings: np.ndarray, index_name: str,
+                     top_k: int = 10, **kwargs) -> List[List[SearchResult]]:
+        """Search for several query vectors, one result list per row"""
+        return self.db.search_batch(query_embeddings, index_name, top_k, **kwargs)
+    
+    def keyword_search(self, keywords: List[str], index_name: str,
+                       top_k: int = 10) -> List[SearchResult]:
+        """Full-text search for chunks containing any of the keywords"""
+        return self.db.keyword_search(keywords, index_name, top_k)
+    
     def get_stats(self, index_name: str) -> Dict[str, Any]:
         """Get index statistics"""
         return self.db.get_stats(index_name)
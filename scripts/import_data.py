@@ -273,8 +273,15 @@ def calculate_confidence_score(fields: Dict[str, Any]) -> float:
     
     return min(1.0, score / total_fields)
 
-def main() -> None:
-    """Main function with enhanced data processing"""
+def main(extracted_map: Dict[str, str] = None) -> None:
+    """
+    Main function with enhanced data processing
+    
+    Args:
+        extracted_map: Optional mapping of text file name to its text, for files whose
+            content is already in memory (e.g. from the extraction phase); those files
+            are not re-read from disk
+    """
     logger.info("🚀 Enhanced Data Import and ACORD Form Processing")
     logger.info("=" * 60)
     
@@ -306,9 +313,12 @@ def main() -> None:
             try:
                 logger.info(f"\n🔄 Processing: {text_file.name}")
                 
-                # Read extracted text
-                with open(text_file, 'r', encoding='utf-8', errors='ignore') as f:
-                    text = f.read()
+                # Read extracted text, reusing the in-memory copy when one was provided
+                if extracted_map and text_file.name in extracted_map:
+                    text = extracted_map[text_file.name]
+                else:
+                    with open(text_file, 'r', encoding='utf-8', errors='ignore') as f:
+                        text = f.read()
                 
                 # Extract fields using enhanced parsing
                 extracted_fields = enhanced_field_parse(text)
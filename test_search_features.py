@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Test Search Features
+Quick behavior checks for FTS5 keyword search, query batching and the ivfpq training path
+
+Uses small random vectors instead of the embedding model, so it runs in seconds.
+
+Author: LLM Claims Processing Team
+Version: 1.0
+"""
+
+import sys
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path for imports
+PROJECT_ROOT = Path(__file__).resolve().parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+DIMENSION = 32
+
+def make_embeddings(contents, start=0, seed=0):
+    """Build EmbeddingResult objects with random unit vectors for the given contents"""
+    from lib.embeddings_generator import EmbeddingResult
+    
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((len(contents), DIMENSION)).astype('float32')
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [
+        EmbeddingResult(
+            chunk_id=f"chunk_{start + i}",
+            embedding=vector,
+            source_file=f"claim_{start + i}.txt",
+            content=content,
+            metadata={},
+            model_name="random",
+            embedding_dim=DIMENSION
+        )
+        for i, (content, vector) in enumerate(zip(contents, vectors))
+    ]
+
+def test_keyword_search():
+    """Test BM25 keyword search over the local FTS5 index"""
+    
+    print("🧪 Testing Keyword Search")
+    print("=" * 40)
+    
+    try:
+        from lib.local_vector_db import LocalVectorDB
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = LocalVectorDB(str(Path(temp_dir) / "index"))
+            db.upsert_embeddings(make_embeddings([
+                "Hail damage to the warehouse roof reported by the insured",
+                "Water damage in the basement after a pipe burst",
+                "Vehicle collision at the loading dock, hail not involved"
+            ]))
+            
+            results = db.keyword_search(["roof"])
+            assert [r.chunk_id for r in results] == ["chunk_0"], results
+            assert 0.0 < results[0].score < 1.0, results[0].score
+            print("✅ Single-term match found")
+            
+            results = db.keyword_search(["hail"])
+            assert {r.chunk_id for r in results} == {"chunk_0", "chunk_2"}, results
+            print("✅ Every matching chunk returned")
+            
+            # FTS5 query syntax in user input is matched literally, not parsed
+            assert db.keyword_search(['roof" OR "water']) == []
+            print("✅ Query syntax is escaped")
+            
+            # Re-upserting a chunk replaces its indexed content
+            db.upsert_embeddings(make_embeddings(["Fire damage to the office kitchen"]))
+            assert db.keyword_search(["roof"]) == []
+            assert [r.chunk_id for r in db.keyword_search(["kitchen"])] == ["chunk_0"]
+            print("✅ Re-upserted content replaces the old text")
+            
+            # The keyword index is rebuilt from saved data on reopen
+            reopened = LocalVectorDB(str(Path(temp_dir) / "index"))
+            assert [r.chunk_id for r in reopened.keyword_search(["basement"])] == ["chunk_1"]
+            print("✅ Keyword index persists across reopen")
+            
+            # A new index starts without the previous chunks
+            db.create_index(dimension=DIMENSION)
+            assert db.keyword_search(["basement"]) == []
+            assert db.get_stats()['total_vectors'] == 0
+            print("✅ create_index clears the keyword index")
+        
+        print("\n🎉 Keyword search tests passed!")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Test failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_query_batcher():
+    """Test that batched searches match direct searches"""
+    
+    print("\n🧪 Testing Query Batcher")
+    print("=" * 40)
+    
+    try:
+        from lib.local_vector_db import LocalVectorDB
+        from lib.search_api import QueryBatcher
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = LocalVectorDB(str(Path(temp_dir) / "index"))
+            embeddings = make_embeddings([f"Claim note {i}" for i in range(200)])
+            db.upsert_embeddings(embeddings)
+            
+            batcher = QueryBatcher(db, "claims-embeddings", window_ms=20.0)
+            queries = [emb.embedding for emb in embeddings[:16]]
+            expected = [[r.chunk_id for r in db.search(q, top_k=3 + i % 3)] for i, q in enumerate(queries)]
+            
+            # Concurrent callers with different k; half pass a search parameter, which
+            # splits the batch into two search_batch calls (flat indexes ignore its value)
+            actual = [None] * len(queries)
+            def run(i):
+                kwargs = {'ef_search': 128} if i % 2 else {}
+                actual[i] = [r.chunk_id for r in batcher.search(queries[i], 3 + i % 3, **kwargs)]
+            threads = [threading.Thread(target=run, args=(i,)) for i in range(len(queries))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            
+            assert actual == expected, (actual, expected)
+            assert all(result[0] == f"chunk_{i}" for i, result in enumerate(actual))
+            print(f"✅ {len(queries)} concurrent queries match direct searches")
+            
+            batcher.close()
+            assert not batcher._worker.is_alive()
+            try:
+                batcher.search(queries[0], 3)
+                raise AssertionError("search after close() should fail")
+            except RuntimeError:
+                pass
+            batcher.close()
+            print("✅ close() stops the worker and rejects new queries")
+        
+        print("\n🎉 Query batcher tests passed!")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Test failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_ivfpq_training():
+    """Test the ivfpq layout before and after training, with and without re-ranking"""
+    
+    print("\n🧪 Testing IVF-PQ Training Path")
+    print("=" * 40)
+    
+    try:
+        from lib.local_vector_db import LocalVectorDB
+        
+        train_size = 300
+        contents = [f"Claim note {i}" for i in range(train_size + 100)]
+        
+        for rerank in (True, False):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                index_path = Path(temp_dir) / "index"
+                db = LocalVectorDB(str(index_path), index_type="ivfpq", rerank=rerank)
+                db.IVFPQ_TRAIN_SIZE = train_size
+                embeddings = make_embeddings(contents)
+                
+                # Below the training size: vectors are kept and searched exactly
+                for start in range(0, train_size - 50, 50):
+                    assert db.upsert_embeddings(embeddings[start:start + 50], persist=False)
+                assert db.index is None
+                assert db.search(embeddings[7].embedding, top_k=1)[0].chunk_id == "chunk_7"
+                # Search parameters for the trained index are accepted (and unused) before training
+                assert db.search(embeddings[7].embedding, top_k=1, nprobe=8)[0].chunk_id == "chunk_7"
+                batch_results = db.search_batch(np.stack([embeddings[3].embedding, embeddings[9].embedding]),
+                                                top_k=2, nprobe=8)
+                assert [results[0].chunk_id for results in batch_results] == ["chunk_3", "chunk_9"]
+                print(f"✅ Exact search before training (rerank={rerank})")
+                
+                # Crossing the training size trains the index on everything stored so far
+                for start in range(train_size - 50, len(embeddings), 50):
+                    assert db.upsert_embeddings(embeddings[start:start + 50], persist=False)
+                assert db.index is not None and db.index.ntotal == len(embeddings)
+                assert db.get_stats()['total_vectors'] == len(embeddings)
+                assert (db.raw_vectors is not None) == rerank
+                assert db.flush()
+                assert (index_path / "raw_vectors.npy").exists() == rerank
+                print(f"✅ Trained on {train_size}+ vectors and saved (rerank={rerank})")
+                
+                # The saved index serves searches after reopening read-only
+                reopened = LocalVectorDB(str(index_path), read_only=True, rerank=rerank)
+                default_nprobe = reopened.index.nprobe
+                results = reopened.search(embeddings[123].embedding, top_k=5, nprobe=reopened.index.nlist)
+                assert len(results) == 5
+                # nprobe applies to this call only; the shared index keeps its default
+                assert reopened.index.nprobe == default_nprobe
+                if rerank:
+                    assert results[0].chunk_id == "chunk_123", results[0].chunk_id
+                    assert abs(results[0].score - 1.0) < 1e-4
+                else:
+                    assert "chunk_123" in [r.chunk_id for r in results]
+                assert not reopened.upsert_embeddings(embeddings[:1])
+                print(f"✅ Reopened index searches correctly (rerank={rerank})")
+        
+        print("\n🎉 IVF-PQ training tests passed!")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Test failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def main():
+    """Main test function"""
+    logging.basicConfig(level=logging.WARNING)
+    
+    results = [test_keyword_search(), test_query_batcher(), test_ivfpq_training()]
+    
+    if all(results):
+        print("\n✅ All search feature tests passed!")
+    else:
+        print("\n❌ Fix the issues above before running the pipeline")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()